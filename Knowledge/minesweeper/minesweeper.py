@@ -1,6 +1,31 @@
 import itertools
+import functools
+import math
 import random
-import copy
+from array import array
+
+import numpy as np
+
+
+@functools.lru_cache(maxsize=None)
+def neighbour_table(height, width):
+    """
+    Returns a precomputed table of neighbours for a board of the given size.
+
+    Cells are numbered row by row, so cell (i, j) has id `i * width + j`.
+    The table is a pair of flat arrays (offsets, neighbours): the neighbours
+    of cell id `n` are `neighbours[offsets[n]:offsets[n + 1]]`.
+    """
+    offsets = array("l", [0])
+    neighbours = array("l")
+    for i in range(height):
+        for j in range(width):
+            for di in (-1, 0, 1):
+                for dj in (-1, 0, 1):
+                    if (di or dj) and 0 <= i + di < height and 0 <= j + dj < width:
+                        neighbours.append((i + di) * width + j + dj)
+            offsets.append(len(neighbours))
+    return offsets, neighbours
 
 
 class Minesweeper():
@@ -8,13 +33,21 @@ class Minesweeper():
     Minesweeper game representation
     """
 
-    def __init__(self, height=8, width=8, mines=8):
+    def __init__(self, height=8, width=8, mines=8, safe=None):
+        """
+        Create a board with `mines` mines placed uniformly at random.
+        If `safe` is an (i, j) cell, that cell is never a mine, and neither
+        are its neighbours when there is room for the mines elsewhere.
+        """
 
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
         self.mines = set()
 
+        # Neighbours of every cell, shared with any AI playing the same size
+        self.offsets, self.neighbours = neighbour_table(height, width)
+
         # Initialize an empty field with no mines
         self.board = []
         for i in range(self.height):
@@ -23,17 +56,50 @@ class Minesweeper():
                 row.append(False)
             self.board.append(row)
 
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        # Cells that may not hold a mine
+        excluded = set()
+        if safe is not None:
+            n = safe[0] * width + safe[1]
+            excluded = {n}
+            around = set(self.neighbours[self.offsets[n]:self.offsets[n + 1]])
+            if height * width - len(around) - 1 >= mines:
+                excluded |= around
+
+        # Add mines by sampling cells without replacement
+        if len(excluded) > 0:
+            candidates = [n for n in range(height * width) if n not in excluded]
+        else:
+            candidates = range(height * width)
+        for n in random.sample(candidates, mines):
+            i, j = divmod(n, width)
+            self.mines.add((i, j))
+            self.board[i][j] = True
+
+        # Number of nearby mines for every cell
+        self.counts = self.count_mines()
 
         # At first, player has found no mines
         self.mines_found = set()
 
+        # Cells revealed so far by `reveal`
+        self.revealed = set()
+
+    def count_mines(self):
+        """
+        Returns a grid with the number of nearby mines of every cell,
+        computed for the whole board at once by summing the eight shifted
+        copies of the zero-padded mine grid.
+        """
+
+        board = np.pad(np.array(self.board, dtype=np.int8), 1)
+        counts = np.zeros((self.height, self.width), dtype=np.int8)
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                if di or dj:
+                    counts += board[1 + di:1 + di + self.height,
+                                    1 + dj:1 + dj + self.width]
+        return counts.tolist()
+
     def print(self):
         """
         Prints a text-based representation
@@ -60,23 +126,32 @@ class Minesweeper():
         not including the cell itself.
         """
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
+        i, j = cell
+        return self.counts[i][j]
 
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
+    def reveal(self, cell):
+        """
+        Reveals a safe cell. If it has no nearby mines, its neighbours are
+        revealed too, repeating for every revealed cell without nearby mines.
 
-        return count
+        Returns a dictionary mapping each newly revealed cell to its number
+        of nearby mines, ready to pass to `MinesweeperAI.add_knowledge_batch`.
+        """
+        revealed = {}
+        stack = [cell]
+        while stack:
+            i, j = stack.pop()
+            if (i, j) in self.revealed:
+                continue
+            self.revealed.add((i, j))
+            revealed[i, j] = self.counts[i][j]
+            if self.counts[i][j] == 0:
+                n = i * self.width + j
+                for neighbour in self.neighbours[self.offsets[n]:self.offsets[n + 1]]:
+                    neighbour = divmod(neighbour, self.width)
+                    if neighbour not in self.revealed:
+                        stack.append(neighbour)
+        return revealed
 
     def won(self):
         """
@@ -139,27 +214,225 @@ class Sentence():
             self.cells.remove(cell)
 
 
+class BitSentence():
+    """
+    Logical statement about a Minesweeper game, like `Sentence`,
+    but storing its cell ids as bits of a Python integer. `Sentence` is
+    kept as the reference it is tested against in test_minesweeper.py.
+
+    Bit k of `mask` stands for cell id `base + k`. `base` is always the
+    lowest cell in the sentence, so the mask only spans the few rows the
+    sentence covers, even on very large boards.
+    """
+
+    def __init__(self, cells, count):
+        self.base = 0
+        self.mask = 0
+        for cell in cells:
+            self.mask |= 1 << cell
+        self.count = count
+        self.normalize()
+
+    def normalize(self):
+        """
+        Shifts the mask so that its lowest set bit is bit 0.
+        """
+        if self.mask:
+            shift = (self.mask & -self.mask).bit_length() - 1
+            self.mask >>= shift
+            self.base += shift
+        else:
+            self.base = 0
+
+    def aligned(self, other):
+        """
+        Returns the mask of `other` shifted onto the base of this sentence.
+        Cells of `other` below this sentence's base are dropped.
+        """
+        shift = other.base - self.base
+        if shift >= 0:
+            return other.mask << shift
+        return other.mask >> -shift
+
+    def __eq__(self, other):
+        return (
+            self.base == other.base and
+            self.mask == other.mask and
+            self.count == other.count
+        )
+
+    def __len__(self):
+        return self.mask.bit_count()
+
+    def __contains__(self, cell):
+        return cell >= self.base and (self.mask >> (cell - self.base)) & 1 == 1
+
+    def __iter__(self):
+        mask = self.mask
+        while mask:
+            low = mask & -mask
+            yield self.base + low.bit_length() - 1
+            mask ^= low
+
+    def __str__(self):
+        return f"{set(self)} = {self.count}"
+
+    @property
+    def cells(self):
+        return set(self)
+
+    def issubset(self, other):
+        """
+        Returns True if every cell of this sentence is also in `other`.
+        """
+        if not self.mask:
+            return True
+        if self.base < other.base:
+            return False
+        return other.aligned(self) & ~other.mask == 0
+
+    def difference(self, other):
+        """
+        Returns a new sentence with the cells of `other` removed, and
+        the count of `other` subtracted. Only meaningful when `other`
+        is a subset of this sentence.
+        """
+        result = BitSentence((), self.count - other.count)
+        result.base = self.base
+        result.mask = self.mask & ~self.aligned(other)
+        result.normalize()
+        return result
+
+    def known_mines(self):
+        """
+        Returns the list of all cells in the sentence known to be mines.
+        """
+        if len(self) == self.count:
+            return list(self)
+        return []
+
+    def known_safes(self):
+        """
+        Returns the list of all cells in the sentence known to be safe.
+        """
+        if self.count == 0:
+            return list(self)
+        return []
+
+    def mark_mine(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be a mine.
+        """
+        if cell in self:
+            self.mask ^= 1 << (cell - self.base)
+            self.count -= 1
+            self.normalize()
+
+    def mark_safe(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be safe.
+        """
+        if cell in self:
+            self.mask ^= 1 << (cell - self.base)
+            self.normalize()
+
+
+class Bitset():
+    """
+    Mutable set of cell ids backed by a packed bit array,
+    with constant-time add and membership tests.
+    """
+
+    def __init__(self, size):
+        self.bits = bytearray((size + 7) // 8)
+        self.size = 0
+
+    def add(self, cell):
+        byte, bit = cell >> 3, 1 << (cell & 7)
+        if not self.bits[byte] & bit:
+            self.bits[byte] |= bit
+            self.size += 1
+
+    def __contains__(self, cell):
+        return self.bits[cell >> 3] >> (cell & 7) & 1 == 1
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for index, byte in enumerate(self.bits):
+            while byte:
+                low = byte & -byte
+                yield (index << 3) + low.bit_length() - 1
+                byte ^= low
+
+    def __or__(self, other):
+        result = Bitset(0)
+        result.bits = bytearray(a | b for a, b in zip(self.bits, other.bits))
+        result.size = sum(byte.bit_count() for byte in result.bits)
+        return result
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
+
+    Cells are given to and returned from the public move methods as
+    (i, j) tuples, but are stored internally as integer ids
+    (`i * width + j`) in `moves_made`, `mines`, `safes` and the knowledge
+    base. Use `cell_id` and `cell` to convert between the two.
+
+    `solver` chooses how knowledge is turned into conclusions:
+    "subsets" uses `infer` and `infer_subsets`, and "linear" uses
+    `infer_linear`.
     """
 
-    def __init__(self, height=8, width=8):
+    SOLVERS = ("subsets", "linear")
+
+    def __init__(self, height=8, width=8, mines=8, solver="subsets"):
+
+        if solver not in MinesweeperAI.SOLVERS:
+            raise ValueError(f"Unknown solver: {solver}")
 
-        # Set initial height and width
+        # Set initial height, width, and total number of mines on the board
         self.height = height
         self.width = width
+        self.total_mines = mines
+        self.solver = solver
 
         # Keep track of which cells have been clicked on
-        self.moves_made = set()
+        self.moves_made = Bitset(height * width)
 
         # Keep track of cells known to be safe or mines
-        self.mines = set()
-        self.safes = set()
+        self.mines = Bitset(height * width)
+        self.safes = Bitset(height * width)
+
+        # Safe cells in the order they were found, some possibly already played
+        self.safe_moves = []
 
         # List of sentences about the game known to be true
         self.knowledge = []
 
+        # Cache of enumerated frontier components, reused across moves
+        self.component_cache = {}
+
+        # Neighbours of every cell id
+        self.offsets, self.neighbours = neighbour_table(height, width)
+
+    def cell_id(self, cell):
+        """
+        Returns the integer id of an (i, j) cell.
+        """
+        return cell[0] * self.width + cell[1]
+
+    def cell(self, cell_id):
+        """
+        Returns the (i, j) cell for an integer id.
+        """
+        return divmod(cell_id, self.width)
+
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
@@ -174,7 +447,9 @@ class MinesweeperAI():
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
-        self.safes.add(cell)
+        if cell not in self.safes:
+            self.safes.add(cell)
+            self.safe_moves.append(cell)
         for sentence in self.knowledge:
             sentence.mark_safe(cell)
 
@@ -194,86 +469,97 @@ class MinesweeperAI():
                if they can be inferred from existing knowledge
         """
 
-        # mark the cell as one of the moves made in the game
-        self.moves_made.add(cell)
+        self.add_knowledge_batch({cell: count})
+
+    def add_knowledge_batch(self, counts):
+        """
+        Like `add_knowledge`, but for a dictionary mapping many revealed
+        cells to their counts, such as the result of `Minesweeper.reveal`.
+        All cells are marked and all sentences added before inference runs,
+        so inference happens once for the whole batch.
+        """
+
+        cells_counts = {self.cell_id(cell): count for cell, count in counts.items()}
 
-        # mark the cell as a safe cell, updating any sequences that contain the cell as well
-        self.mark_safe(cell)
+        for cell in cells_counts:
+            # mark the cell as one of the moves made in the game
+            self.moves_made.add(cell)
 
-        # add new sentence to AI knowledge base based on value of cell and count
-        cells = set()
-        count_cpy = copy.deepcopy(count)
+            # mark the cell as a safe cell, updating any sequences that contain the cell as well
+            self.mark_safe(cell)
 
-        # get neighbour cells
-        close_cells = self.get_neighbours(cell) 
+        for cell, count in cells_counts.items():
 
-        for cl in close_cells:
-            if cl in self.mines:
-                count_cpy -= 1
-            if cl not in self.mines | self.safes:
-                # only add cells that are of unknown state
-                cells.add(cl)  
+            # add new sentence to AI knowledge base based on value of cell and count
+            cells = set()
+            count_cpy = count
 
-        # Create a new sentence
-        new_sentence = Sentence(cells, count_cpy)           
+            # get neighbour cells
+            close_cells = self.get_neighbours(cell)
 
-        # if Sentence is not empty add it to the Knowledge
-        if len(new_sentence.cells) > 0:                 
-            self.knowledge.append(new_sentence)
+            for cl in close_cells:
+                if cl in self.mines:
+                    count_cpy -= 1
+                elif cl not in self.safes:
+                    # only add cells that are of unknown state
+                    cells.add(cl)
+
+            # Create a new sentence
+            new_sentence = BitSentence(cells, count_cpy)
+
+            # if Sentence is not empty add it to the Knowledge
+            if len(new_sentence) > 0:
+                self.knowledge.append(new_sentence)
 
         # Check if any inference can be made after the addition of more knowledge
-        self.infer()
+        if self.solver == "linear":
+            self.infer_linear()
+        else:
+            self.infer()
 
-        self.infer_subsets()
+            self.infer_subsets()
 
     def get_neighbours(self, cell):
         """
-        returns cell that are 1 cell away from cell passed in arg
+        returns ids of cells that are 1 cell away from cell id passed in arg
         """
-        neighbours = set()
-        for rows in range(self.height):
-            for columns in range(self.width):
-                if abs(cell[0] - rows) <= 1 and abs(cell[1] - columns) <= 1 and (rows, columns) != cell:
-                    neighbours.add((rows, columns))
-        return neighbours
+        return self.neighbours[self.offsets[cell]:self.offsets[cell + 1]]
 
     def infer(self):
         """
         check knowledge for new safes and mines, updates knowledge if possible
-        
-        For Each Sentence in Knowledge:
-            1) if Sentence is empty Remove it from Knowledge
-            2) Get a list of mines and safe cells from Sentence
-            3) if list of mines is not empty then for each mine, mark it as a mine in AI's list of mines
-            and see if any more inferences can be reached
-            4) if list of safes is not empty then for each safe, mark it as safe in AI's list of safes,
-            and  see if any more inferences can be reached
-        """
-        # copies the knowledge to operate on copy
-        knowledge_copy = copy.deepcopy(self.knowledge)
-        # iterates through sentences
-
-        for sentence in knowledge_copy:
-            if len(sentence.cells) == 0:
-                try:
-                    self.knowledge.remove(sentence)
-                except ValueError:
-                    pass
+
+        Starting with every Sentence in Knowledge as the Sentences to check:
+            1) Get a list of mines and safe cells from each Sentence to check
+            2) if nothing new was found, stop
+            3) mark each mine in AI's list of mines and each safe in AI's list of safes,
+            which updates every Sentence that contains them
+            4) check again only the Sentences that contained a newly marked cell
+        Finally remove empty Sentences from Knowledge.
+        """
+        to_check = self.knowledge
+
+        while to_check:
             # check for possible mines and safes
-            mines = sentence.known_mines()
-            safes = sentence.known_safes()
-
-            # update knowledge if mine or safe was found
-            if mines:
-                for mine in mines:
-                    # print(f"Marking {mine} as mine")
-                    self.mark_mine(mine)
-                    self.infer()
-            if safes:
-                for safe in safes:
-                    # print(f"Marking {safe} as safe")
-                    self.mark_safe(safe)
-                    self.infer()
+            mines = set()
+            safes = set()
+            for sentence in to_check:
+                mines.update(m for m in sentence.known_mines() if m not in self.mines)
+                safes.update(s for s in sentence.known_safes() if s not in self.safes)
+            if not mines and not safes:
+                break
+
+            # only sentences that lose a cell can give new conclusions
+            marked = mines | safes
+            to_check = [s for s in self.knowledge if not marked.isdisjoint(s)]
+
+            # update knowledge with the mines and safes found
+            for mine in mines:
+                self.mark_mine(mine)
+            for safe in safes:
+                self.mark_safe(safe)
+
+        self.knowledge = [s for s in self.knowledge if len(s) > 0]
 
     def infer_subsets(self):
         """
@@ -283,10 +569,8 @@ class MinesweeperAI():
         for sentence1 in self.knowledge:
             for sentence2 in self.knowledge:
                 # check if sentence 1 is subset of sentence 2
-                if sentence1.cells.issubset(sentence2.cells):
-                    new_cells = sentence2.cells - sentence1.cells
-                    new_count = sentence2.count - sentence1.count
-                    new_sentence = Sentence(new_cells, new_count)
+                if sentence1.issubset(sentence2):
+                    new_sentence = sentence2.difference(sentence1)
                     mines = new_sentence.known_mines()
                     safes = new_sentence.known_safes()
                     if mines:
@@ -297,6 +581,47 @@ class MinesweeperAI():
                         for safe in safes:
                             self.mark_safe(safe)
 
+    def infer_linear(self):
+        """
+        update knowledge by treating the sentences as a system of linear
+        equations over the frontier cells, each cell being 0 (safe) or 1 (mine).
+
+        Each round splits the sentences into components that share no cells,
+        using `frontier_components`, and applies bound reasoning to each
+        component's:
+            1) sentences on their own (as `infer` does)
+            2) differences of pairs of sentences where one is a subset of
+               the other (as `infer_subsets` does)
+            3) rows of the reduced row echelon form of its equations,
+               which combines overlapping sentences
+        Rows are kept sparse, as dictionaries of cell -> coefficient, so the
+        work grows with the size of each component, not the whole frontier.
+        A row whose count equals the sum of its positive coefficients forces
+        those cells to be mines and its negative-coefficient cells to be safe,
+        and symmetrically for the sum of its negative coefficients.
+        Rounds repeat until nothing new is found.
+        """
+
+        while True:
+            self.knowledge = [s for s in self.knowledge if len(s) > 0]
+
+            mines = set()
+            safes = set()
+            for component in self.frontier_components():
+                equations = [(dict.fromkeys(cells, 1.0), count) for cells, count in component]
+                rows = equations + subset_differences(component) + row_reduce(equations)
+                component_mines, component_safes = forced_cells(rows)
+                mines |= component_mines
+                safes |= component_safes
+
+            if not mines and not safes:
+                return
+
+            for mine in sorted(mines):
+                self.mark_mine(mine)
+            for safe in sorted(safes):
+                self.mark_safe(safe)
+
     def make_safe_move(self):
         """
         Returns a safe cell to choose on the Minesweeper board.
@@ -306,27 +631,366 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        for i in self.safes - self.moves_made:
-            # choose first safe cell that wasn't picked before
-            return i
+        # drop safe cells that were already picked
+        while self.safe_moves and self.safe_moves[-1] in self.moves_made:
+            self.safe_moves.pop()
+        for i in reversed(self.safe_moves):
+            # choose a safe cell that wasn't picked before
+            if i not in self.moves_made:
+                return self.cell(i)
         return None
 
     def make_random_move(self):
         """
         Returns a move to make on the Minesweeper board.
-        Should choose randomly among cells that:
+        Should choose among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+        Picks the cell with the lowest probability of being a mine,
+        breaking ties randomly.
         """
+        probabilities = self.mine_probabilities()
+        if not probabilities:
+            return None
+
+        lowest = min(probabilities.values())
+        candidates = [
+            cell for cell, p in probabilities.items()
+            if math.isclose(p, lowest)
+        ]
+        return self.cell(random.choice(candidates))
+
+    def mine_probabilities(self):
+        """
+        Returns a dictionary mapping every undecided cell id to the
+        probability that it is a mine, given all sentences in the
+        knowledge base and the total number of mines on the board.
+
+        The frontier (cells mentioned in some sentence) is split into
+        independent components. Each component is enumerated on its own,
+        and the results are combined, weighting each total number of
+        frontier mines by the number of ways to place the remaining
+        mines among the unconstrained cells.
+        """
+        known = self.moves_made | self.mines | self.safes
+        undecided = set(
+            cell for cell in range(self.height * self.width)
+            if cell not in known
+        )
+
+        # Known safe cells that have not been played are certainly safe
+        probabilities = {
+            cell: 0.0 for cell in self.safes
+            if cell not in self.moves_made
+        }
+
+        components = self.frontier_components()
+        frontier = set()
+        for component in components:
+            for cells, count in component:
+                frontier |= cells
+        unconstrained = len(undecided - frontier)
+        remaining = self.total_mines - len(self.mines)
+
+        # Distribution of (number of solutions, per-cell mine counts)
+        # over the number of mines used, for each component
+        distributions = [self.enumerate_component(c) for c in components]
+
+        # Log of the weight of a total of `k` frontier mines: the number of
+        # ways to place the remaining mines among the unconstrained cells.
+        # Computed once per total, as a float, since the exact binomial
+        # coefficients have hundreds of thousands of digits on large boards
+        totals = self.convolve(distributions)
+        log_weights = {
+            k: log_comb(unconstrained, remaining - k) for k in totals
+        }
+
+        # Knowledge is inconsistent with the mine count; fall back
+        # to ignoring the global count
+        if all(w == -math.inf for w in log_weights.values()):
+            log_weights = {k: 0.0 for k in totals}
+
+        # Logs of the terms of the total weight; placement counts are exact
+        # integers and may be too large for a float, but not their logs
+        log_total = log_sum(
+            math.log(ways) + log_weights[k] for k, ways in totals.items()
+        )
+
+        # No consistent placement at all; every undecided cell is equally likely
+        if log_total == -math.inf:
+            for cell in undecided:
+                probabilities[cell] = 0.5
+            return probabilities
+
+        for index, distribution in enumerate(distributions):
+            others = self.convolve(distributions[:index] + distributions[index + 1:])
+            others = [(k, math.log(ways)) for k, ways in others.items()]
+            cell_weights = {}
+            for k, (ways, cell_counts) in distribution.items():
+                for other_k, log_other in others:
+                    log_w = log_other + log_weights[k + other_k] - log_total
+                    if log_w == -math.inf:
+                        continue
+                    for cell, n in cell_counts.items():
+                        if n:
+                            cell_weights[cell] = (
+                                cell_weights.get(cell, 0) + math.exp(math.log(n) + log_w)
+                            )
+            for cell in distribution_cells(components[index]):
+                probabilities[cell] = cell_weights.get(cell, 0)
+
+        if unconstrained:
+            expected = sum(
+                math.exp(math.log(ways) + log_weights[k] - log_total) * (remaining - k)
+                for k, ways in totals.items()
+            )
+            density = min(max(expected / unconstrained, 0.0), 1.0)
+            for cell in undecided - frontier:
+                probabilities[cell] = density
+
+        return probabilities
+
+    def frontier_components(self):
+        """
+        Splits the non-empty sentences in the knowledge base into groups
+        that share no cells. Returns a list of components, each a list of
+        (frozenset of cells, count) constraints.
+        """
+        constraints = set(
+            (frozenset(sentence), sentence.count)
+            for sentence in self.knowledge
+            if len(sentence) > 0
+        )
+
+        # Union-find over cells, joining every cell of a constraint
+        parent = {}
+
+        def find(cell):
+            while parent[cell] != cell:
+                parent[cell] = parent[parent[cell]]
+                cell = parent[cell]
+            return cell
+
+        for cells, count in constraints:
+            for cell in cells:
+                parent.setdefault(cell, cell)
+            first = find(next(iter(cells)))
+            for cell in cells:
+                root = find(cell)
+                if root != first:
+                    parent[root] = first
+
+        groups = {}
+        for constraint in constraints:
+            root = find(next(iter(constraint[0])))
+            groups.setdefault(root, []).append(constraint)
+        return list(groups.values())
+
+    def enumerate_component(self, component):
+        """
+        Enumerates every mine placement consistent with all constraints
+        in `component` using backtracking.
 
-        maxmoves = self.width * self.height
+        Returns a dictionary mapping a number of mines to a tuple of
+        (number of placements, dict of cell -> placements where it is a mine).
+        Results are cached, since most components are unchanged between moves.
+        """
+        key = frozenset(component)
+        if key in self.component_cache:
+            return self.component_cache[key]
+
+        cells = sorted(distribution_cells(component))
+        index = {cell: n for n, cell in enumerate(cells)}
+        constraints = [
+            ([index[cell] for cell in constraint_cells], count)
+            for constraint_cells, count in component
+        ]
+
+        # Constraints touching each cell, and per-constraint running totals
+        touching = [[] for _ in cells]
+        for c, (members, count) in enumerate(constraints):
+            for n in members:
+                touching[n].append(c)
+        mines_placed = [0] * len(constraints)
+        unassigned = [len(members) for members, count in constraints]
+
+        assignment = [0] * len(cells)
+        results = {}
+
+        def backtrack(n, used):
+            if n == len(cells):
+                ways, counts = results.get(used, (0, [0] * len(cells)))
+                for m in range(len(cells)):
+                    counts[m] += assignment[m]
+                results[used] = (ways + 1, counts)
+                return
+
+            for value in (0, 1):
+                feasible = True
+                for c in touching[n]:
+                    mines_placed[c] += value
+                    unassigned[c] -= 1
+                    count = constraints[c][1]
+                    if mines_placed[c] > count or mines_placed[c] + unassigned[c] < count:
+                        feasible = False
+                if feasible:
+                    assignment[n] = value
+                    backtrack(n + 1, used + value)
+                for c in touching[n]:
+                    mines_placed[c] -= value
+                    unassigned[c] += 1
+            assignment[n] = 0
+
+        backtrack(0, 0)
+
+        distribution = {
+            used: (ways, {cells[m]: counts[m] for m in range(len(cells))})
+            for used, (ways, counts) in results.items()
+        }
+        self.component_cache[key] = distribution
+        return distribution
+
+    @staticmethod
+    def convolve(distributions):
+        """
+        Combines independent component distributions into a dictionary
+        mapping a total number of mines to the number of placements.
+        """
+        totals = {0: 1}
+        for distribution in distributions:
+            combined = {}
+            for k, ways in totals.items():
+                for used, (component_ways, _) in distribution.items():
+                    combined[k + used] = combined.get(k + used, 0) + ways * component_ways
+            totals = combined
+        return totals
 
-        while maxmoves > 0:
-            maxmoves -= 1
-            row = random.randrange(self.height)
-            column = random.randrange(self.width)
 
-            if (row, column) not in self.moves_made | self.mines:
-                return (row, column)
+def log_comb(n, k):
+    """
+    Returns the natural logarithm of the binomial coefficient C(n, k),
+    or -inf if it is 0.
+    """
+    if k < 0 or k > n:
+        return -math.inf
+    return math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+
+
+def log_sum(values):
+    """
+    Returns the logarithm of the sum of the exponentials of `values`.
+    """
+    values = list(values)
+    largest = max(values, default=-math.inf)
+    if largest == -math.inf:
+        return largest
+    return largest + math.log(sum(math.exp(v - largest) for v in values))
+
+
+def subset_differences(component):
+    """
+    Returns the difference of every pair of constraints in `component`
+    where the cells of one are a proper subset of the cells of the other,
+    as a list of (row, count) pairs like those of `row_reduce`.
+    """
+
+    containing = {}
+    for k, (cells, count) in enumerate(component):
+        for cell in cells:
+            containing.setdefault(cell, []).append(k)
 
-        return None
\ No newline at end of file
+    rows = []
+    for cells, count in component:
+        # Every superset also contains any one cell of the subset
+        for k in containing[next(iter(cells))]:
+            other_cells, other_count = component[k]
+            if cells < other_cells:
+                rows.append((dict.fromkeys(other_cells - cells, 1.0), other_count - count))
+    return rows
+
+
+def row_reduce(rows, epsilon=1e-9):
+    """
+    Returns the non-zero rows of the reduced row echelon form of the system
+    `rows`, a list of (row, count) pairs where each row is a dictionary of
+    cell -> coefficient, as a list of pairs of the same kind. Columns are
+    taken in order of cell id, and each pivot is eliminated only from the
+    rows that contain its cell.
+    """
+
+    counts = [float(count) for row, count in rows]
+    rows = [dict(row) for row, count in rows]
+
+    # Rows with a non-zero coefficient for each cell
+    containing = {}
+    for k, row in enumerate(rows):
+        for cell in row:
+            containing.setdefault(cell, set()).add(k)
+
+    pivots = []
+    for col in sorted(containing):
+        candidates = containing[col].difference(pivots)
+        if not candidates:
+            continue
+        pivot = max(candidates, key=lambda k: abs(rows[k][col]))
+        pivot_row = rows[pivot]
+        scale = pivot_row[col]
+        for cell in pivot_row:
+            pivot_row[cell] /= scale
+        counts[pivot] /= scale
+        pivots.append(pivot)
+
+        for k in list(containing[col]):
+            if k == pivot:
+                continue
+            row = rows[k]
+            factor = row[col]
+            for cell, value in pivot_row.items():
+                value = row.get(cell, 0.0) - factor * value
+                if abs(value) < epsilon:
+                    if cell in row:
+                        del row[cell]
+                        containing[cell].discard(k)
+                else:
+                    row[cell] = value
+                    containing[cell].add(k)
+            counts[k] -= factor * counts[pivot]
+
+    return [(rows[k], counts[k]) for k in pivots]
+
+
+def forced_cells(rows, epsilon=1e-9):
+    """
+    Applies bound reasoning to every (row, count) pair of `rows`, where each
+    row is a dictionary of cell -> coefficient and every cell is 0 or 1.
+    Returns the (mines, safes) sets of cells that are forced.
+    """
+
+    mines = set()
+    safes = set()
+    for row, count in rows:
+        positive = [cell for cell, value in row.items() if value > epsilon]
+        negative = [cell for cell, value in row.items() if value < -epsilon]
+        upper = sum(row[cell] for cell in positive)
+        lower = sum(row[cell] for cell in negative)
+
+        # Count reaches the largest possible value: positive cells are all mines
+        if abs(count - upper) < epsilon:
+            mines.update(positive)
+            safes.update(negative)
+
+        # Count reaches the smallest possible value: positive cells are all safe
+        if abs(count - lower) < epsilon:
+            mines.update(negative)
+            safes.update(positive)
+    return mines, safes
+
+
+def distribution_cells(component):
+    """
+    Returns the set of all cells mentioned by the constraints of a component.
+    """
+    cells = set()
+    for constraint_cells, count in component:
+        cells |= constraint_cells
+    return cells
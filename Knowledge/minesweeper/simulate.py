@@ -0,0 +1,164 @@
+import argparse
+import multiprocessing
+import random
+import sys
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play many Minesweeper games with the AI, without pygame."
+    )
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--height", type=int, default=8)
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("--mines", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--safe-first-click", action="store_true",
+                        help="never place mines on or around the first move")
+    parser.add_argument("--solver", choices=MinesweeperAI.SOLVERS,
+                        default="subsets")
+    parser.add_argument("--min-win-rate", type=float, default=None,
+                        help="exit with an error if the win rate is lower")
+    parser.add_argument("--max-batch-ms", type=float, default=None,
+                        help="exit with an error if any add_knowledge_batch "
+                             "call takes longer")
+    args = parser.parse_args()
+
+    results = simulate(
+        args.games, args.height, args.width, args.mines,
+        seed=args.seed, processes=args.processes, solver=args.solver,
+        safe_first_click=args.safe_first_click
+    )
+
+    print(f"Games: {results['games']} "
+          f"({args.height}x{args.width}, {args.mines} mines, "
+          f"seed {args.seed}, {args.solver} solver)")
+    print(f"  Win rate: {results['win_rate']:.4f}")
+    print(f"  Moves per game: {results['moves_per_game']:.2f}")
+    print(f"  add_knowledge_batch p50: {results['p50'] * 1000:.3f} ms")
+    print(f"  add_knowledge_batch p99: {results['p99'] * 1000:.3f} ms")
+    print(f"  add_knowledge_batch max: {results['max'] * 1000:.3f} ms")
+
+    if args.min_win_rate is not None and results["win_rate"] < args.min_win_rate:
+        sys.exit(f"Win rate below {args.min_win_rate}")
+    if args.max_batch_ms is not None and results["max"] * 1000 > args.max_batch_ms:
+        sys.exit(f"add_knowledge_batch took longer than {args.max_batch_ms} ms")
+
+
+def play_game(height, width, mines, seed, solver="subsets",
+              safe_first_click=False):
+    """
+    Play one game with the AI, seeding the random number generator with
+    `seed` so that the board and the AI's random choices are reproducible.
+    Revealed cells without nearby mines open their neighbours, and each
+    reveal is passed to the AI as one batch.
+
+    Return a tuple (won, moves, timings) where `timings` is a list of
+    seconds spent in each call to `add_knowledge_batch`.
+    """
+    random.seed(seed)
+    ai = MinesweeperAI(height=height, width=width, mines=mines, solver=solver)
+
+    # The board can be generated after the first move is chosen
+    first = ai.make_random_move()
+    game = Minesweeper(height=height, width=width, mines=mines,
+                       safe=first if safe_first_click else None)
+
+    moves = 0
+    timings = []
+    while True:
+        if first is not None:
+            move, first = first, None
+        else:
+            move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+        if move is None:
+            won = set(ai.cell(mine) for mine in ai.mines) == game.mines
+            return won, moves, timings
+
+        moves += 1
+        if game.is_mine(move):
+            return False, moves, timings
+
+        start = time.perf_counter()
+        ai.add_knowledge_batch(game.reveal(move))
+        timings.append(time.perf_counter() - start)
+
+        # Every safe cell revealed: the remaining cells are all mines
+        if len(ai.moves_made) == height * width - mines:
+            return True, moves, timings
+
+
+def play_games(args):
+    """
+    Play a batch of games in a worker process.
+    """
+    height, width, mines, seeds, solver, safe_first_click = args
+    return [
+        play_game(height, width, mines, seed, solver, safe_first_click)
+        for seed in seeds
+    ]
+
+
+def simulate(games, height, width, mines, seed=0, processes=None,
+             solver="subsets", safe_first_click=False):
+    """
+    Play `games` games across a pool of `processes` worker processes.
+    Game k is seeded with `seed + k`, so results do not depend on the
+    number of processes.
+
+    Return a dictionary with the number of games, the win rate, the mean
+    number of moves per game, and the median, 99th percentile and longest
+    time of a call to `add_knowledge_batch`, in seconds.
+    """
+    processes = processes or multiprocessing.cpu_count()
+    seeds = list(range(seed, seed + games))
+    batches = [
+        (height, width, mines, seeds[k::processes], solver, safe_first_click)
+        for k in range(processes)
+        if seeds[k::processes]
+    ]
+
+    if processes == 1:
+        outcomes = [play_games(batch) for batch in batches]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            outcomes = pool.map(play_games, batches)
+
+    wins = 0
+    moves = 0
+    timings = []
+    for batch in outcomes:
+        for won, game_moves, game_timings in batch:
+            wins += won
+            moves += game_moves
+            timings.extend(game_timings)
+    timings.sort()
+
+    return {
+        "games": games,
+        "win_rate": wins / games if games else 0,
+        "moves_per_game": moves / games if games else 0,
+        "p50": percentile(timings, 50),
+        "p99": percentile(timings, 99),
+        "max": timings[-1] if timings else 0,
+    }
+
+
+def percentile(values, p):
+    """
+    Return the `p`th percentile of a sorted list, or 0 if it is empty.
+    """
+    if not values:
+        return 0
+    index = min(len(values) - 1, int(len(values) * p / 100))
+    return values[index]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import random
+import unittest
+
+import simulate
+from minesweeper import BitSentence, Bitset, Sentence
+
+# Cell ids are drawn from a window of a wide board, so sentences can
+# start far from cell 0 and still overlap
+BOARD = 1000 * 1000
+WINDOW = 64
+
+
+def random_cells(rng, start):
+    """
+    Return a random set of cell ids between `start` and `start + WINDOW`.
+    """
+    return set(rng.sample(range(start, start + WINDOW), rng.randint(0, 12)))
+
+
+def random_pair(rng):
+    """
+    Return a `Sentence` and a `BitSentence` over the same random cells.
+    """
+    cells = random_cells(rng, rng.randrange(BOARD - WINDOW))
+    count = rng.randint(0, len(cells))
+    return Sentence(cells, count), BitSentence(cells, count)
+
+
+def same(sentence, bit_sentence):
+    return (
+        sentence.cells == bit_sentence.cells and
+        sentence.count == bit_sentence.count and
+        len(sentence.cells) == len(bit_sentence)
+    )
+
+
+class TestBitSentence(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(0)
+
+    def test_cells(self):
+        for _ in range(1000):
+            sentence, bit_sentence = random_pair(self.rng)
+            self.assertTrue(same(sentence, bit_sentence))
+            for cell in range(min(sentence.cells, default=0) - 2, max(sentence.cells, default=0) + 3):
+                self.assertEqual(cell in sentence.cells, cell in bit_sentence)
+
+    def test_issubset_and_difference(self):
+        for _ in range(1000):
+            start = self.rng.randrange(BOARD - 2 * WINDOW)
+            cells = random_cells(self.rng, start)
+            if self.rng.random() < 0.5:
+                # A subset, as the AI finds between overlapping sentences
+                other_cells = set(self.rng.sample(sorted(cells), self.rng.randint(0, len(cells))))
+            else:
+                other_cells = random_cells(self.rng, start + self.rng.randint(-WINDOW, WINDOW))
+            count = len(cells) // 2
+            other_count = len(other_cells) // 3
+
+            sentence, other = Sentence(cells, count), Sentence(other_cells, other_count)
+            bit_sentence = BitSentence(cells, count)
+            bit_other = BitSentence(other_cells, other_count)
+
+            self.assertEqual(other.cells <= sentence.cells, bit_other.issubset(bit_sentence))
+            self.assertEqual(sentence.cells <= other.cells, bit_sentence.issubset(bit_other))
+            if other.cells <= sentence.cells:
+                difference = Sentence(sentence.cells - other.cells, count - other_count)
+                self.assertTrue(same(difference, bit_sentence.difference(bit_other)))
+
+    def test_mark_and_known(self):
+        for _ in range(1000):
+            sentence, bit_sentence = random_pair(self.rng)
+            low = min(sentence.cells, default=0)
+            for _ in range(self.rng.randint(0, 15)):
+                cell = self.rng.randint(low - 2, low + WINDOW + 2)
+                if self.rng.random() < 0.5 and sentence.count > 0:
+                    sentence.mark_mine(cell)
+                    bit_sentence.mark_mine(cell)
+                else:
+                    sentence.mark_safe(cell)
+                    bit_sentence.mark_safe(cell)
+                self.assertTrue(same(sentence, bit_sentence))
+                self.assertEqual(sentence.known_mines(), set(bit_sentence.known_mines()))
+                self.assertEqual(sentence.known_safes(), set(bit_sentence.known_safes()))
+
+
+class TestBitset(unittest.TestCase):
+
+    def test_membership_and_union(self):
+        rng = random.Random(0)
+        size = 10000
+        for _ in range(100):
+            expected = [set(), set()]
+            bitsets = [Bitset(size), Bitset(size)]
+            for cells, bitset in zip(expected, bitsets):
+                for cell in rng.choices(range(size), k=rng.randint(0, 300)):
+                    cells.add(cell)
+                    bitset.add(cell)
+                self.assertEqual(len(cells), len(bitset))
+                self.assertEqual(sorted(cells), list(bitset))
+                for cell in rng.sample(range(size), 100):
+                    self.assertEqual(cell in cells, cell in bitset)
+
+            union = bitsets[0] | bitsets[1]
+            self.assertEqual(len(expected[0] | expected[1]), len(union))
+            self.assertEqual(sorted(expected[0] | expected[1]), list(union))
+
+
+class TestAddKnowledgeBatch(unittest.TestCase):
+
+    def test_large_reveal(self):
+        # The first click opens thousands of cells, passed to the AI as one batch
+        won, moves, timings = simulate.play_game(
+            150, 150, 2500, seed=7, safe_first_click=True
+        )
+        self.assertTrue(won)
+        self.assertEqual(moves, len(timings))
+
+    def test_linear_large_board(self):
+        # A large dense frontier, where reducing all sentences as one
+        # system took over 30 seconds for a single batch
+        results = simulate.simulate(
+            1, 150, 150, 2500, seed=7, processes=1, solver="linear",
+            safe_first_click=True
+        )
+        self.assertEqual(results["win_rate"], 1)
+        self.assertLess(results["max"], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -61,6 +61,9 @@ class Crossword():
         with open(words_file) as f:
             self.words = set(f.read().upper().splitlines())
 
+        # Bitset index of the vocabulary, built on first use by `word_index`
+        self.index = None
+
         # Determine variable set
         self.variables = set()
         for i in range(self.height):
@@ -108,26 +111,119 @@ class Crossword():
         # For any pair of variables v1, v2, their overlap is either:
         #    None, if the two variables do not overlap; or
         #    (i, j), where v1's ith character overlaps v2's jth character
-        self.overlaps = dict()
-        for v1 in self.variables:
-            for v2 in self.variables:
-                if v1 == v2:
-                    continue
-                cells1 = v1.cells
-                cells2 = v2.cells
-                intersection = set(cells1).intersection(cells2)
-                if not intersection:
-                    self.overlaps[v1, v2] = None
-                else:
-                    intersection = intersection.pop()
-                    self.overlaps[v1, v2] = (
-                        cells1.index(intersection),
-                        cells2.index(intersection)
-                    )
+        # Only overlapping pairs are stored; other pairs look up as None.
+        # A cell is shared by at most one across and one down variable.
+        self.overlaps = Overlaps()
+        crossings = dict()
+        for var in self.variables:
+            for k, cell in enumerate(var.cells):
+                crossings.setdefault(cell, []).append((var, k))
+        for cell, crossing in crossings.items():
+            if len(crossing) == 2:
+                (v1, i), (v2, j) = crossing
+                self.overlaps[v1, v2] = (i, j)
+                self.overlaps[v2, v1] = (j, i)
+
+        # Neighbors of each variable, as a set and as a list of
+        # (neighbor, i, j) where var's ith character is neighbor's jth
+        self.adjacency = {var: [] for var in self.variables}
+        for (v1, v2), (i, j) in self.overlaps.items():
+            self.adjacency[v1].append((v2, i, j))
+        self.neighbor_sets = {
+            var: frozenset(v for v, _, _ in self.adjacency[var])
+            for var in self.variables
+        }
 
     def neighbors(self, var):
         """Given a variable, return set of overlapping variables."""
-        return set(
-            v for v in self.variables
-            if v != var and self.overlaps[v, var]
-        )
+        return self.neighbor_sets[var]
+
+    def word_index(self):
+        """Return a `WordIndex` of the vocabulary."""
+        if self.index is None:
+            self.index = WordIndex(self.words)
+        return self.index
+
+
+class Overlaps(dict):
+    """
+    Dictionary of overlaps between pairs of variables, which gives None
+    for pairs that do not overlap instead of storing them.
+    """
+
+    def __missing__(self, key):
+        return None
+
+
+class WordIndex():
+    """
+    Letter-position index of a vocabulary.
+
+    The words of each length are numbered in sorted order, and a set of
+    words of one length is stored as an int with bit n set if it holds
+    word n, so sets are intersected with & and counted with bit_count.
+    `letters[length][k][letter]` is the set of words of `length` with
+    `letter` at position k.
+    """
+
+    def __init__(self, words):
+        self.words = dict()
+        for word in sorted(words):
+            self.words.setdefault(len(word), []).append(word)
+        self.ids = {
+            word: n
+            for words in self.words.values()
+            for n, word in enumerate(words)
+        }
+
+        self.letters = dict()
+        for length, words in self.words.items():
+            positions = [dict() for _ in range(length)]
+            for n, word in enumerate(words):
+                for k, letter in enumerate(word):
+                    positions[k].setdefault(letter, []).append(n)
+            self.letters[length] = [
+                {letter: bitset(ids) for letter, ids in position.items()}
+                for position in positions
+            ]
+
+    def all(self, length):
+        """Return the set of all words of `length`."""
+        return (1 << len(self.words.get(length, ()))) - 1
+
+    def bit(self, word):
+        """Return the set holding only `word`."""
+        return 1 << self.ids[word]
+
+    def position(self, length, k):
+        """
+        Return a dictionary mapping letters to the set of words of
+        `length` with that letter at position k.
+        """
+        if length not in self.letters:
+            return {}
+        return self.letters[length][k]
+
+    def matching(self, length, k, letter):
+        """Return the set of words of `length` with `letter` at position k."""
+        return self.position(length, k).get(letter, 0)
+
+    def members(self, length, words):
+        """Return a list of the words in `words`, a set of words of `length`."""
+        bits = bin(words)[:1:-1]
+        members = []
+        n = bits.find("1")
+        while n != -1:
+            members.append(self.words[length][n])
+            n = bits.find("1", n + 1)
+        return members
+
+
+def bitset(ids):
+    """Return an int with the bits in list `ids` set."""
+    if not ids:
+        return 0
+    data = bytearray(ids[-1] // 8 + 1)
+    for n in ids:
+        data[n >> 3] |= 1 << (n & 7)
+    return int.from_bytes(data, "little")
@@ -1,19 +1,41 @@
 import sys
+from collections import deque
 
 from crossword import *
 
 
 class CrosswordCreator:
 
-    def __init__(self, crossword):
+    # "backtrack" searches with the assignment alone; "mac" maintains arc
+    # consistency after every assignment; "index" does the same with
+    # domains stored as bitsets of a `WordIndex`
+    SOLVERS = ("backtrack", "mac", "index")
+
+    def __init__(self, crossword, solver="backtrack"):
         """
         Create new CSP crossword generate.
         """
+        if solver not in self.SOLVERS:
+            raise ValueError(f"Unknown solver: {solver}")
         self.crossword = crossword
+        self.solver = solver
         self.domains = {
             var: self.crossword.words.copy() for var in self.crossword.variables
         }
 
+        # While `ac3` runs, support[var][k][letter] counts the words in the
+        # domain of `var` with `letter` at position k
+        self.support = None
+
+        # While the "mac" solver runs, every (var, word) removed from a
+        # domain, in order, so that removals can be undone; the "index"
+        # solver records (var, previous bitset) instead
+        self.trail = None
+
+        # While the "index" solver runs, the domain of each variable as a
+        # bitset of the crossword's `WordIndex`, in place of `self.domains`
+        self.masks = None
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -93,9 +115,46 @@ class CrosswordCreator:
         """
         Enforce node and arc consistency, and then solve the CSP.
         """
+        if self.solver == "index":
+            return self.solve_index()
+
         self.enforce_node_consistency()
-        self.ac3()
-        return self.backtrack(dict())
+        if not self.ac3():
+            return None
+        if self.solver == "backtrack":
+            return self.backtrack(dict())
+
+        self.support = self.letter_support()
+        self.trail = []
+        try:
+            return self.backtrack_mac(dict())
+        finally:
+            self.support = None
+            self.trail = None
+
+    def solve_index(self):
+        """
+        Solve the CSP like the "mac" solver, with each domain held as a
+        bitset over the words of the variable's length.
+
+        Domains start from the crossword's vocabulary: taking every word
+        of the right length is node consistency. When the search ends,
+        `self.domains` is set to the words left in each bitset.
+        """
+        index = self.crossword.word_index()
+        self.masks = {
+            var: index.all(var.length) for var in self.crossword.variables
+        }
+        self.trail = []
+        try:
+            if not self.ac3():
+                return None
+            return self.backtrack_mac(dict())
+        finally:
+            for var, words in self.masks.items():
+                self.domains[var] = set(index.members(var.length, words))
+            self.masks = None
+            self.trail = None
 
     def enforce_node_consistency(self):
         """
@@ -123,27 +182,114 @@ class CrosswordCreator:
         False if no revision was made.
         """
 
-        # Define a variable to store the value True if revision was made
-        revised = False
-
         # Get all Overlaps Between x and y
         overlap = self.crossword.overlaps[x, y]
+        if overlap is None:
+            return False
+        i, j = overlap
+
+        if self.masks is not None:
+            return self.revise_masks(x, y, i, j)
+
+        # Letters that words of y can put in the shared cell
+        if self.support is not None:
+            letters = self.support[y][j]
+        else:
+            letters = set(y_word[j] for y_word in self.domains[y])
 
-        # If overlaps exist, make x arc consistent with y
-        if overlap is not None:
-            i, j = overlap
+        # Remove the words of x whose letter no word of y matches
+        removed = [x_word for x_word in self.domains[x] if x_word[i] not in letters]
+        for x_word in removed:
+            self.remove_value(x, x_word)
+
+        return bool(removed)
+
+    def revise_masks(self, x, y, i, j):
+        """
+        Make variable `x` arc consistent with variable `y`, where x's ith
+        character overlaps y's jth, with domains held in `self.masks`.
 
-            # For each word in the domain of Variable x
-            for x_word in set(self.domains[x]):
+        Return True if a revision was made to the domain of `x`.
+        """
+        index = self.crossword.word_index()
+        x_letters = index.position(x.length, i)
+        y_letters = index.position(y.length, j)
+
+        # Words of x with a letter that some word of y has at the overlap
+        allowed = 0
+        for letter, words in y_letters.items():
+            if words & self.masks[y]:
+                allowed |= x_letters.get(letter, 0)
+
+        words = self.masks[x] & allowed
+        if words == self.masks[x]:
+            return False
+        self.set_mask(x, words)
+        return True
 
-                # Remove the word if no constraint satisfying word is found in the domain of y
-                if all(x_word[i] != y_word[j] for y_word in self.domains[y]):
-                    self.domains[x].remove(x_word)
+    def set_mask(self, var, words):
+        """
+        Set the domain of `var` to bitset `words`, recording the previous
+        domain on the trail if it is in use.
+        """
+        if self.trail is not None:
+            self.trail.append((var, self.masks[var]))
+        self.masks[var] = words
 
-                    # Set Revised to true, as the domain of x has been revised
-                    revised = True
+    def domain_size(self, var):
+        """
+        Return the number of words in the domain of `var`.
+        """
+        if self.masks is not None:
+            return self.masks[var].bit_count()
+        return len(self.domains[var])
 
-        return revised
+    def remove_value(self, var, word):
+        """
+        Remove `word` from the domain of `var`, keeping `self.support` up
+        to date if it is in use.
+        """
+        self.domains[var].remove(word)
+        if self.trail is not None:
+            self.trail.append((var, word))
+        if self.support is not None:
+            for k, letter in enumerate(word):
+                counts = self.support[var][k]
+                counts[letter] -= 1
+                if not counts[letter]:
+                    del counts[letter]
+
+    def undo(self, mark):
+        """
+        Put back every word removed from a domain since the trail had
+        length `mark`, most recent first. For the "index" solver, each
+        trail entry holds a whole previous bitset instead of a word.
+        """
+        while len(self.trail) > mark:
+            var, word = self.trail.pop()
+            if self.masks is not None:
+                self.masks[var] = word
+                continue
+            self.domains[var].add(word)
+            if self.support is not None:
+                for k, letter in enumerate(word):
+                    counts = self.support[var][k]
+                    counts[letter] = counts.get(letter, 0) + 1
+
+    def letter_support(self):
+        """
+        Return a dictionary mapping each variable to a list with, for
+        each position in the variable, a dictionary from letters to the
+        number of words in the variable's domain with that letter there.
+        """
+        support = {}
+        for var, domain in self.domains.items():
+            support[var] = [dict() for _ in range(var.length)]
+            for word in domain:
+                for k, letter in enumerate(word):
+                    counts = support[var][k]
+                    counts[letter] = counts.get(letter, 0) + 1
+        return support
 
     def ac3(self, arcs=None):
         """
@@ -160,28 +306,39 @@ class CrosswordCreator:
             arcs = [
                 (x, y)
                 for x in self.crossword.variables
-                for y in self.crossword.neighbors(x)
+                for y, _, _ in self.crossword.adjacency[x]
             ]
 
-        # Initialize the queue with the list of arcs
-        queue = list(arcs)
-
-        # Process arcs until the queue is empty
-        while queue:
-
-            # Dequeue an arc from the queue
-            (x, y) = queue.pop(0)
-
-            # Revise the domains to make the arc (x, y) consistent
-            if self.revise(x, y):
-
-                # If the domain of x is empty after revision, no solution exists
-                if not self.domains[x]:
-                    return False
+        # Queue of arcs to revise, and the same arcs as a set, so that an
+        # arc already waiting is not added again
+        queue = deque(arcs)
+        queued = set(queue)
+
+        # Letter counts let `revise` check each word of x in constant time;
+        # the "mac" solver keeps them up to date for the whole search
+        built_support = self.support is None and self.masks is None
+        if built_support:
+            self.support = self.letter_support()
+        try:
+            while queue:
+                (x, y) = queue.popleft()
+                queued.discard((x, y))
+
+                # Revise the domains to make the arc (x, y) consistent
+                if self.revise(x, y):
+
+                    # If the domain of x is empty after revision, no solution exists
+                    if not self.domain_size(x):
+                        return False
 
-                # Enqueue all arcs (z, x) where z is a neighbor of x, excluding y
-                for z in self.crossword.neighbors(x) - {y}:
-                    queue.append((z, x))
+                    # Enqueue all arcs (z, x) where z is a neighbor of x, excluding y
+                    for z, _, _ in self.crossword.adjacency[x]:
+                        if z != y and (z, x) not in queued:
+                            queue.append((z, x))
+                            queued.add((z, x))
+        finally:
+            if built_support:
+                self.support = None
 
         # Return True if arc consistency is enforced and no domains are empty
         return True
@@ -206,16 +363,13 @@ class CrosswordCreator:
             if var.length != len(word):
                 return False
 
-            # Iterate over each neighbor of the current variable
-            for neighbor in self.crossword.neighbors(var):
-                # If the neighbor is already assigned
-                if neighbor in assignment:
-
-                    # Get the overlap positions between the current variable and the neighbor
-                    i, j = self.crossword.overlaps[var, neighbor]
-                    # Check if the characters at the overlap positions match
-                    if word[i] != assignment[neighbor][j]:
-                        return False
+            # Iterate over each neighbor of the current variable, where the
+            # current variable's ith character overlaps the neighbor's jth
+            for neighbor, i, j in self.crossword.adjacency[var]:
+                # If the neighbor is already assigned, check if the characters
+                # at the overlap positions match
+                if neighbor in assignment and word[i] != assignment[neighbor][j]:
+                    return False
         # If all checks are passed, the assignment is consistent
         return True
 
@@ -227,26 +381,57 @@ class CrosswordCreator:
         that rules out the fewest values among the neighbors of `var`.
         """
 
-        # Define a helper function to count the number of values ruled out
+        if self.masks is not None:
+            return self.order_domain_masks(var, assignment)
+
+        # Only consider neighbors that are not yet assigned, with the
+        # overlap position in the variable, the size of the neighbor's
+        # domain, and how many of its words have each letter at the overlap
+        crossings = []
+        for neighbor, i, j in self.crossword.adjacency[var]:
+            if neighbor in assignment:
+                continue
+            if self.support is not None:
+                counts = self.support[neighbor][j]
+            else:
+                counts = dict()
+                for neighbor_value in self.domains[neighbor]:
+                    counts[neighbor_value[j]] = counts.get(neighbor_value[j], 0) + 1
+            crossings.append((i, len(self.domains[neighbor]), counts))
+
+        # Define a helper function to count the number of values ruled out:
+        # the neighbor's words without the current value's letter at the overlap
         def count_ruled_out(value):
-            count = 0
-            # Iterate over each neighbor of the variable
-            for neighbor in self.crossword.neighbors(var):
-                # Only consider neighbors that are not yet assigned
-                if neighbor not in assignment:
-                    # Get the overlap positions between the variable and the neighbor
-                    i, j = self.crossword.overlaps[var, neighbor]
-                    # Count how many values in the neighbor's domain are inconsistent with the current value
-                    count += sum(
-                        1
-                        for neighbor_value in self.domains[neighbor]
-                        if neighbor_value[j] != value[i]
-                    )
-            return count
+            return sum(
+                size - counts.get(value[i], 0)
+                for i, size, counts in crossings
+            )
 
         # Sort the domain of the variable by the number of values they rule out for neighbors
         return sorted(self.domains[var], key=count_ruled_out)
 
+    def order_domain_masks(self, var, assignment):
+        """
+        Return the words in the domain of `var` in the same order as
+        `order_domain_values`, with domains held in `self.masks`: the
+        words a value leaves a neighbor are the neighbor's bitset ANDed
+        with the index's bitset for the value's letter at the overlap.
+        """
+        index = self.crossword.word_index()
+        crossings = [
+            (i, self.masks[neighbor], index.position(neighbor.length, j))
+            for neighbor, i, j in self.crossword.adjacency[var]
+            if neighbor not in assignment
+        ]
+
+        def count_ruled_out(value):
+            return sum(
+                words.bit_count() - (words & letters.get(value[i], 0)).bit_count()
+                for i, words, letters in crossings
+            )
+
+        return sorted(index.members(var.length, self.masks[var]), key=count_ruled_out)
+
     def select_unassigned_variable(self, assignment):
         """
         Return an unassigned variable not already part of `assignment`.
@@ -262,9 +447,9 @@ class CrosswordCreator:
         # Define a key function for sorting the unassigned variables
         def key_func(var):
             # Return a tuple with the number of remaining values and the negative degree
-            # Number of remaining values (len(self.domains[var])) should be minimized
-            # Degree (-len(self.crossword.neighbors(var))) should be maximized (hence negative)
-            return (len(self.domains[var]), -len(self.crossword.neighbors(var)))
+            # Number of remaining values (self.domain_size(var)) should be minimized
+            # Degree (-len(self.crossword.adjacency[var])) should be maximized (hence negative)
+            return (self.domain_size(var), -len(self.crossword.adjacency[var]))
 
         # Return the unassigned variable that minimizes the key function
         return min(unassigned, key=key_func)
@@ -305,21 +490,72 @@ class CrosswordCreator:
         # If no valid assignment is found, return None
         return None
 
+    def backtrack_mac(self, assignment):
+        """
+        Like `backtrack`, but after each assignment reduce the variable's
+        domain to its word and restore arc consistency with `ac3`, starting
+        from the arcs into the variable.
+
+        `assignment` is extended in place rather than copied, and domain
+        removals are recorded on `self.trail` and undone when a word fails,
+        so each step costs only as much as the domains it changes.
+        """
+        if len(assignment) == len(self.crossword.variables):
+            return dict(assignment)
+
+        var = self.select_unassigned_variable(assignment)
+        for value in self.order_domain_values(var, assignment):
+
+            # Only the new variable's crossings with assigned variables can conflict
+            if any(
+                neighbor in assignment and value[i] != assignment[neighbor][j]
+                for neighbor, i, j in self.crossword.adjacency[var]
+            ):
+                continue
+
+            mark = len(self.trail)
+            assignment[var] = value
+            if self.masks is not None:
+                self.set_mask(var, self.crossword.word_index().bit(value))
+            else:
+                for word in [word for word in self.domains[var] if word != value]:
+                    self.remove_value(var, word)
+
+            arcs = [
+                (neighbor, var)
+                for neighbor, _, _ in self.crossword.adjacency[var]
+                if neighbor not in assignment
+            ]
+            if self.ac3(arcs):
+                result = self.backtrack_mac(assignment)
+                if result is not None:
+                    return result
+
+            del assignment[var]
+            self.undo(mark)
+
+        return None
+
 
 def main():
 
     # Check usage
-    if len(sys.argv) not in [3, 4]:
-        sys.exit("Usage: python generate.py structure words [output]")
+    solvers = {"--mac": "mac", "--index": "index"}
+    args = [arg for arg in sys.argv[1:] if arg not in solvers]
+    if len(args) not in [2, 3]:
+        sys.exit("Usage: python generate.py structure words [output] [--mac | --index]")
 
     # Parse command-line arguments
-    structure = sys.argv[1]
-    words = sys.argv[2]
-    output = sys.argv[3] if len(sys.argv) == 4 else None
+    structure = args[0]
+    words = args[1]
+    output = args[2] if len(args) == 3 else None
+    solver = "backtrack"
+    for flag in sys.argv[1:]:
+        solver = solvers.get(flag, solver)
 
     # Generate crossword
     crossword = Crossword(structure, words)
-    creator = CrosswordCreator(crossword)
+    creator = CrosswordCreator(crossword, solver=solver)
     assignment = creator.solve()
 
     # Print result
@@ -0,0 +1,114 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+
+from heredity import (
+    enumerate_probabilities, load_data, log_probabilities, vectorized_probabilities
+)
+
+METHODS = ["elimination", "vectorized", "log", "enumerate"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compute heredity probabilities for many family files."
+    )
+    parser.add_argument("families",
+                        help="directory of family CSV files, or a manifest "
+                             "file listing one CSV path per line")
+    parser.add_argument("--method", choices=METHODS, default="elimination")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--output", default=None,
+                        help="JSON lines file to write (default: stdout)")
+    args = parser.parse_args()
+
+    paths = family_paths(args.families)
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        failures = 0
+        for record in run_batch(paths, args.method, args.processes):
+            failures += "error" in record
+            output.write(json.dumps(record) + "\n")
+    finally:
+        if args.output:
+            output.close()
+
+    print(f"Processed {len(paths)} families, {failures} failed", file=sys.stderr)
+
+
+def family_paths(families):
+    """
+    Return the paths of the family CSV files in directory `families`, in
+    sorted order, or listed in manifest file `families`. Blank lines and
+    lines starting with # in a manifest are skipped, and relative paths
+    are relative to the manifest.
+    """
+    if os.path.isdir(families):
+        return [
+            os.path.join(families, name)
+            for name in sorted(os.listdir(families))
+            if name.endswith(".csv")
+        ]
+
+    base = os.path.dirname(families)
+    with open(families) as f:
+        return [
+            os.path.join(base, line.strip())
+            for line in f
+            if line.strip() and not line.startswith("#")
+        ]
+
+
+def run_batch(paths, method="elimination", processes=None, chunksize=16):
+    """
+    Generate one result record per path in `paths`, in order, computed
+    across a pool of `processes` worker processes.
+
+    Each worker process builds the inheritance tables from `PROBS` once
+    and reuses them for every family it is given.
+    """
+    tasks = [(path, method) for path in paths]
+    if processes == 1:
+        yield from map(query, tasks)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        yield from pool.imap(query, tasks, chunksize)
+
+
+def query(args):
+    """
+    Return the result record for one family file: a dictionary with the
+    file's path and either its probabilities, keyed as in `main` of
+    heredity.py but with string keys, or the error that stopped it.
+    """
+    path, method = args
+    try:
+        people = load_data(path)
+        if method == "elimination":
+            from elimination import eliminate_probabilities
+            probabilities = eliminate_probabilities(people)
+        elif method == "vectorized":
+            probabilities = vectorized_probabilities(people)
+        elif method == "log":
+            probabilities = log_probabilities(people)
+        else:
+            probabilities = enumerate_probabilities(people)
+    except (OSError, KeyError, ValueError) as e:
+        return {"family": path, "error": f"{type(e).__name__}: {e}"}
+
+    return {
+        "family": path,
+        "probabilities": {
+            person: {
+                field: {str(value).lower(): p for value, p in distribution.items()}
+                for field, distribution in fields.items()
+            }
+            for person, fields in probabilities.items()
+        },
+    }
+
+
+if __name__ == "__main__":
+    main()
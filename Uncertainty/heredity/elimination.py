@@ -0,0 +1,207 @@
+import numpy as np
+
+from heredity import PROBS, empty_probabilities, inheritance_array
+
+
+def eliminate_probabilities(people):
+    """
+    Compute gene and trait probabilities for each person exactly, treating
+    the family as a Bayesian network instead of enumerating assignments.
+
+    Each person's gene count is a variable, conditioned on their parents'
+    gene counts; observed traits only weigh that person's gene count, and
+    unobserved traits follow from it. The gene variables are eliminated in
+    a min-fill order, the cliques that order creates are joined into a
+    junction tree, and two passes of message passing over the tree give
+    every person's marginal at once. Cost grows with the size of the
+    largest clique rather than with 6 ** n.
+    """
+    names = list(people)
+    index = {name: k for k, name in enumerate(names)}
+    factors = family_factors(people, index)
+
+    # Interaction graph: people sharing a factor must be eliminated together
+    neighbours = [set() for _ in names]
+    for scope, _ in factors:
+        for a in scope:
+            neighbours[a].update(b for b in scope if b != a)
+
+    order = elimination_order(neighbours)
+    cliques, parents = junction_tree(neighbours, order)
+    marginals = calibrate(factors, cliques, parents, order)
+
+    probabilities = empty_probabilities(people)
+    for name in names:
+        genes = marginals[index[name]]
+        trait = people[name]["trait"]
+        for g in (0, 1, 2):
+            probabilities[name]["gene"][g] = float(genes[g])
+        for value in (True, False):
+            if trait is None:
+                probabilities[name]["trait"][value] = float(sum(
+                    genes[g] * PROBS["trait"][g][value] for g in (0, 1, 2)
+                ))
+            else:
+                probabilities[name]["trait"][value] = float(trait == value)
+    return probabilities
+
+
+def family_factors(people, index):
+    """
+    Return a list of (scope, table) factors, one per person. `scope` is a
+    tuple of person ids and `table` has one axis of size 3 (gene count)
+    per id in `scope`. A person's own gene count is the last axis.
+    """
+    inheritance = inheritance_array()
+    unconditional = np.array([PROBS["gene"][g] for g in range(3)])
+
+    factors = []
+    for name, person in people.items():
+
+        # Weight of each gene count given the observed trait, if any
+        if person["trait"] is None:
+            evidence = np.ones(3)
+        else:
+            evidence = np.array([PROBS["trait"][g][person["trait"]] for g in range(3)])
+
+        if person["mother"] is None:
+            factors.append(((index[name],), unconditional * evidence))
+        else:
+            scope = (index[person["mother"]], index[person["father"]], index[name])
+            factors.append((scope, inheritance * evidence))
+    return factors
+
+
+def elimination_order(neighbours):
+    """
+    Return an order in which to eliminate the variables of an interaction
+    graph, greedily choosing the variable whose elimination adds the fewest
+    new edges between its neighbours (min-fill), breaking ties by degree.
+    """
+    neighbours = [set(n) for n in neighbours]
+    remaining = set(range(len(neighbours)))
+    order = []
+
+    def fill(v):
+        nbrs = list(neighbours[v])
+        return sum(
+            1
+            for i, a in enumerate(nbrs)
+            for b in nbrs[i + 1:]
+            if b not in neighbours[a]
+        )
+
+    while remaining:
+        v = min(remaining, key=lambda v: (fill(v), len(neighbours[v]), v))
+        for a in neighbours[v]:
+            neighbours[a] |= neighbours[v] - {a}
+            neighbours[a].discard(v)
+        remaining.remove(v)
+        order.append(v)
+    return order
+
+
+def junction_tree(neighbours, order):
+    """
+    Return (cliques, parents) for the junction tree induced by eliminating
+    variables in `order`.
+
+    `cliques[v]` is the tuple of variables connected when `v` is eliminated,
+    starting with `v` itself. The clique of `v` hangs below the clique of
+    the first of its other variables to be eliminated, `parents[v]`, or is
+    a root if it has none. Clique `v` shares all its variables but `v`
+    with its parent.
+    """
+    neighbours = [set(n) for n in neighbours]
+    position = {v: k for k, v in enumerate(order)}
+    cliques = {}
+    parents = {}
+
+    for v in order:
+        others = sorted(neighbours[v], key=position.get)
+        cliques[v] = (v,) + tuple(others)
+        parents[v] = others[0] if others else None
+        for a in others:
+            neighbours[a] |= neighbours[v] - {a}
+            neighbours[a].discard(v)
+    return cliques, parents
+
+
+def calibrate(factors, cliques, parents, order):
+    """
+    Run sum-product message passing over the junction tree and return a
+    dictionary mapping every variable to its normalized marginal.
+    Messages are normalized as they are sent, so large families do not
+    underflow.
+    """
+    position = {v: k for k, v in enumerate(order)}
+    children = {v: [] for v in order}
+    for v in order:
+        if parents[v] is not None:
+            children[parents[v]].append(v)
+
+    # Give each factor to the clique of its first-eliminated variable
+    potentials = {v: np.ones((3,) * len(cliques[v])) for v in order}
+    for scope, table in factors:
+        v = min(scope, key=position.get)
+        potentials[v] = product(potentials[v], cliques[v], table, scope)
+
+    # Upward pass: children are always eliminated before their parents
+    up = {}
+    for v in order:
+        belief = potentials[v]
+        for c in children[v]:
+            belief = product(belief, cliques[v], up[c], cliques[c][1:])
+        if parents[v] is not None:
+            up[v] = normalized(belief.sum(axis=0))
+
+    # Downward pass, from the roots back down
+    down = {}
+    marginals = {}
+    for v in reversed(order):
+        belief = potentials[v]
+        if parents[v] is not None:
+            belief = product(belief, cliques[v], down[v], cliques[v][1:])
+        for c in children[v]:
+            belief = product(belief, cliques[v], up[c], cliques[c][1:])
+        marginals[v] = normalized(belief.sum(axis=tuple(range(1, belief.ndim))))
+
+        for c in children[v]:
+            message = potentials[v]
+            if parents[v] is not None:
+                message = product(message, cliques[v], down[v], cliques[v][1:])
+            for other in children[v]:
+                if other != c:
+                    message = product(message, cliques[v], up[other], cliques[other][1:])
+            down[c] = normalized(marginalize(message, cliques[v], cliques[c][1:]))
+
+    return marginals
+
+
+def product(table, scope, other, other_scope):
+    """
+    Return `table` (over `scope`) multiplied by `other` (over `other_scope`,
+    a subset of `scope`), as a table over `scope`.
+    """
+    axes = {v: k for k, v in enumerate(scope)}
+    return np.einsum(
+        table, list(range(len(scope))),
+        other, [axes[v] for v in other_scope],
+        list(range(len(scope)))
+    )
+
+
+def marginalize(table, scope, keep):
+    """
+    Return `table` (over `scope`) summed over every variable not in `keep`,
+    as a table over `keep`, in that order.
+    """
+    axes = {v: k for k, v in enumerate(scope)}
+    return np.einsum(table, list(range(len(scope))), [axes[v] for v in keep])
+
+
+def normalized(table):
+    """
+    Return `table` scaled to sum to 1.
+    """
+    return table / table.sum()
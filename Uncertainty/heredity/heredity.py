@@ -1,7 +1,11 @@
 import csv
+import functools
 import itertools
+import math
 import sys
 
+import numpy as np
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -40,12 +44,45 @@ PROBS = {
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python heredity.py data.csv [method]")
     people = load_data(sys.argv[1])
+    method = sys.argv[2] if len(sys.argv) == 3 else "enumerate"
+
+    # Compute gene and trait probabilities for each person
+    if method == "enumerate":
+        probabilities = enumerate_probabilities(people)
+    elif method == "log":
+        probabilities = log_probabilities(people)
+    elif method == "vectorized":
+        probabilities = vectorized_probabilities(people)
+    elif method == "elimination":
+        from elimination import eliminate_probabilities
+        probabilities = eliminate_probabilities(people)
+    elif method in ("likelihood", "gibbs"):
+        from sampling import gibbs_sampling, likelihood_weighting
+        sample = likelihood_weighting if method == "likelihood" else gibbs_sampling
+        probabilities, diagnostics = sample(people)
+        for name, value in diagnostics.items():
+            print(f"{name}: {value:.4g}")
+    else:
+        sys.exit(f"Unknown method: {method}")
 
-    # Keep track of gene and trait probabilities for each person
-    probabilities = {
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def empty_probabilities(people):
+    """
+    Return a probabilities dictionary with every value set to 0.
+    """
+    return {
         person: {
             "gene": {
                 2: 0,
@@ -60,38 +97,144 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
 
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
+def enumerate_probabilities(people):
+    """
+    Compute gene and trait probabilities for each person by summing the
+    joint probability of every assignment consistent with the evidence.
+    """
 
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
+    # Keep track of gene and trait probabilities for each person
+    probabilities = empty_probabilities(people)
+
+    # Loop over every assignment consistent with the known traits
+    for one_gene, two_genes, have_trait in assignments(people):
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+        # Update probabilities with new joint probability
+        p = joint_probability(people, one_gene, two_genes, have_trait)
+        update(probabilities, one_gene, two_genes, have_trait, p)
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
 
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+    return probabilities
+
+
+def log_probabilities(people):
+    """
+    Compute the same probabilities as `enumerate_probabilities`, keeping
+    every joint probability and running sum as a logarithm.
+
+    Joint probabilities of large families are too small for a float and
+    round to 0, after which `normalize` divides by zero; their logarithms
+    are ordinary numbers, and sums of them are taken with log-sum-exp.
+
+    This still enumerates every assignment, so it only reaches families
+    small enough to enumerate. For pedigrees of hundreds of people, use
+    `eliminate_probabilities` in elimination.py, which normalizes its
+    messages as it passes them and so does not underflow either.
+    """
+    log_probs = {
+        person: {
+            "gene": {2: -math.inf, 1: -math.inf, 0: -math.inf},
+            "trait": {True: -math.inf, False: -math.inf}
+        }
+        for person in people
+    }
+
+    for one_gene, two_genes, have_trait in assignments(people):
+        log_p = log_joint_probability(people, one_gene, two_genes, have_trait)
+        log_update(log_probs, one_gene, two_genes, have_trait, log_p)
+
+    return log_normalize(log_probs)
+
+
+def vectorized_probabilities(people, chunk_size=1 << 16):
+    """
+    Compute the same probabilities as `enumerate_probabilities`, but with
+    NumPy, evaluating up to `chunk_size` joint probabilities at a time.
+
+    Each person has a gene variable (0, 1 or 2) and, if their trait is
+    unknown, a trait variable (0 or 1). The first few variables are
+    enumerated once as a block of integer arrays; every assignment of the
+    remaining variables then fixes them to constants, and the joint
+    probabilities of the whole block are computed with one table lookup
+    per person. Memory depends on `chunk_size`, not on the family size.
+    """
+
+    names = list(people)
+    index = {name: k for k, name in enumerate(names)}
+    unknown = [name for name in names if people[name]["trait"] is None]
+    trait_variable = {name: len(names) + k for k, name in enumerate(unknown)}
+    radix = [3] * len(names) + [2] * len(unknown)
+
+    # Enumerate the block of low variables, at most `chunk_size` assignments
+    low = 0
+    size = 1
+    while low < len(radix) and size * radix[low] <= chunk_size:
+        size *= radix[low]
+        low += 1
+    block = np.indices(radix[:low]).reshape(low, size)
+
+    # Per person, a table of P(gene | parents) * P(trait | gene), indexed by
+    # (mother, father, gene, trait) or (gene, trait), without the trait axis
+    # when the trait is observed
+    trait_probs = np.array([[PROBS["trait"][g][t] for t in (False, True)] for g in range(3)])
+    tables = {}
+    for name in names:
+        person = people[name]
+        if person["mother"] is None:
+            table = np.array([PROBS["gene"][g] for g in range(3)])[:, None] * trait_probs
+        else:
+            table = inheritance_array()[..., None] * trait_probs
+        if person["trait"] is not None:
+            table = table[..., int(person["trait"])]
+        tables[name] = table.ravel()
+
+    genes_sum = np.zeros((len(names), 3))
+    traits_sum = np.zeros((len(names), 2))
+    total = 0.0
+
+    for high in itertools.product(*(range(r) for r in radix[low:])):
+        values = list(block) + list(high)
+
+        joint = np.ones(size)
+        for name in names:
+            person = people[name]
+            flat = values[index[name]]
+            if person["mother"] is not None:
+                flat = (values[index[person["mother"]]] * 3 + values[index[person["father"]]]) * 3 + flat
+            if name in trait_variable:
+                flat = flat * 2 + values[trait_variable[name]]
+            joint *= tables[name][flat]
+
+        # Variables in the block are counted per assignment, constants at once
+        chunk_total = joint.sum()
+        total += chunk_total
+        for name in names:
+            k = index[name]
+            if k < low:
+                genes_sum[k] += np.bincount(block[k], weights=joint, minlength=3)
+            else:
+                genes_sum[k][values[k]] += chunk_total
+            if name in trait_variable:
+                v = trait_variable[name]
+                if v < low:
+                    traits_sum[k] += np.bincount(block[v], weights=joint, minlength=2)
+                else:
+                    traits_sum[k][values[v]] += chunk_total
+            else:
+                traits_sum[k][int(people[name]["trait"])] += chunk_total
+
+    probabilities = empty_probabilities(people)
+    for name in names:
+        k = index[name]
+        for g in range(3):
+            probabilities[name]["gene"][g] = float(genes_sum[k, g])
+        probabilities[name]["trait"][False] = float(traits_sum[k, 0])
+        probabilities[name]["trait"][True] = float(traits_sum[k, 1])
+    normalize(probabilities)
+    return probabilities
 
 
 def load_data(filename):
@@ -128,6 +271,90 @@ def powerset(s):
     ]
 
 
+def assignments(people):
+    """
+    Lazily generate every (one_gene, two_genes, have_trait) assignment of
+    sets of people that agrees with the known traits.
+
+    Assignments are enumerated as bitmasks over the people, so nothing is
+    stored but the current assignment. People with a known trait are fixed
+    to it, and only subsets of the people with an unknown trait are tried.
+    """
+    names = list(people)
+    everyone = (1 << len(names)) - 1
+    known = sum(1 << k for k, name in enumerate(names) if people[name]["trait"])
+    unknown = sum(1 << k for k, name in enumerate(names) if people[name]["trait"] is None)
+
+    for trait_mask in submasks(unknown):
+        have_trait = members(names, known | trait_mask)
+        for two_mask in submasks(everyone):
+            two_genes = members(names, two_mask)
+            for one_mask in submasks(everyone & ~two_mask):
+                yield members(names, one_mask), two_genes, have_trait
+
+
+def submasks(mask):
+    """
+    Generate every bitmask whose set bits are a subset of those of `mask`.
+    """
+    sub = mask
+    while True:
+        yield sub
+        if sub == 0:
+            return
+        sub = (sub - 1) & mask
+
+
+def members(names, mask):
+    """
+    Return the set of names whose bits are set in `mask`.
+    """
+    return {name for k, name in enumerate(names) if mask >> k & 1}
+
+
+@functools.lru_cache(maxsize=None)
+def inheritance_table():
+    """
+    Return a table where `table[mother][father][genes]` is the probability
+    that a child has `genes` copies of the gene, given how many copies
+    the mother and father have.
+
+    The table is computed once per process and shared, so it must not be
+    modified.
+    """
+    passing = {
+        2: 1 - PROBS["mutation"],
+        1: 0.5,
+        0: PROBS["mutation"]
+    }
+    table = {}
+    for mother in passing:
+        table[mother] = {}
+        for father in passing:
+            m, f = passing[mother], passing[father]
+            table[mother][father] = {
+                2: m * f,
+                1: m * (1 - f) + (1 - m) * f,
+                0: (1 - m) * (1 - f)
+            }
+    return table
+
+
+@functools.lru_cache(maxsize=None)
+def inheritance_array():
+    """
+    Return `inheritance_table` as a read-only NumPy array indexed by
+    [mother genes, father genes, genes].
+    """
+
+    table = inheritance_table()
+    array = np.array([
+        [[table[m][f][g] for g in range(3)] for f in range(3)] for m in range(3)
+    ])
+    array.setflags(write=False)
+    return array
+
+
 def joint_probability(people, one_gene, two_genes, have_trait):
     """
     Compute and return a joint probability.
@@ -191,6 +418,29 @@ def joint_probability(people, one_gene, two_genes, have_trait):
     return probability
 
 
+def log_joint_probability(people, one_gene, two_genes, have_trait):
+    """
+    Return the natural logarithm of `joint_probability` for the same
+    arguments, computed as a sum of logarithms so that it does not
+    underflow, however many people there are.
+    """
+    def genes(person):
+        return 2 if person in two_genes else 1 if person in one_gene else 0
+
+    table = inheritance_table()
+    log_p = 0.0
+    for person in people:
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        if mother is None and father is None:
+            gene_prob = PROBS["gene"][genes(person)]
+        else:
+            gene_prob = table[genes(mother)][genes(father)][genes(person)]
+        trait_prob = PROBS["trait"][genes(person)][person in have_trait]
+        log_p += math.log(gene_prob) + math.log(trait_prob)
+    return log_p
+
+
 def update(probabilities, one_gene, two_genes, have_trait, p):
     """
     Add to `probabilities` a new joint probability `p`.
@@ -243,5 +493,56 @@ def normalize(probabilities):
             probabilities[person]['trait'][trait] /= trait_total
 
 
+def log_update(log_probs, one_gene, two_genes, have_trait, log_p):
+    """
+    Add a joint probability, given as its logarithm `log_p`, to
+    `log_probs`, a dictionary shaped like `probabilities` that holds the
+    logarithm of each running sum.
+    """
+    for person in log_probs:
+        genes = 2 if person in two_genes else 1 if person in one_gene else 0
+        has_trait = person in have_trait
+        for field, value in (("gene", genes), ("trait", has_trait)):
+            log_probs[person][field][value] = log_add(log_probs[person][field][value], log_p)
+
+
+def log_normalize(log_probs):
+    """
+    Return a probabilities dictionary with each distribution of the
+    logarithms in `log_probs` exponentiated and normalized to sum to 1.
+    """
+    probabilities = {}
+    for person in log_probs:
+        probabilities[person] = {}
+        for field, distribution in log_probs[person].items():
+            total = log_sum(distribution.values())
+            probabilities[person][field] = {
+                value: math.exp(log_p - total) for value, log_p in distribution.items()
+            }
+    return probabilities
+
+
+def log_add(a, b):
+    """
+    Return log(exp(a) + exp(b)) without leaving log space.
+    """
+    if a < b:
+        a, b = b, a
+    if b == -math.inf:
+        return a
+    return a + math.log1p(math.exp(b - a))
+
+
+def log_sum(values):
+    """
+    Return the logarithm of the sum of the exponentials of `values`.
+    """
+    values = list(values)
+    largest = max(values)
+    if largest == -math.inf:
+        return largest
+    return largest + math.log(sum(math.exp(v - largest) for v in values))
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,335 @@
+import multiprocessing
+
+import numpy as np
+
+from heredity import PROBS, empty_probabilities, inheritance_array
+
+# Samples drawn at once by each likelihood weighting chain
+BATCH_SIZE = 10000
+
+
+def likelihood_weighting(people, samples=100000, chains=4, processes=None,
+                         seed=None):
+    """
+    Estimate gene and trait probabilities for each person by likelihood
+    weighting.
+
+    Each sample draws every person's gene count given their parents',
+    from the founders down, and is weighted by the probability of the
+    observed traits given the sampled genes. `samples` are split between
+    `chains` independent chains with their own seeds, run across a pool
+    of `processes` worker processes.
+
+    Return a tuple (probabilities, diagnostics): `probabilities` has the
+    same structure as the result of `enumerate_probabilities`, and
+    `diagnostics` is a dictionary with the number of samples, the
+    effective sample size of the weights, and the largest standard error
+    of any probability, estimated from the spread between chains.
+    """
+    if chains < 2:
+        raise ValueError("At least two chains are needed to estimate errors")
+
+    network = pedigree(people)
+    seeds = np.random.SeedSequence(seed).spawn(chains)
+    per_chain = -(-samples // chains)
+    results = run_chains(weighting_chain, [
+        (network, per_chain, seeds[k]) for k in range(chains)
+    ], processes)
+
+    # Chains keep their weights relative to their own largest log weight
+    shift = max(result[4] for result in results)
+    genes = np.zeros((len(people), 3))
+    traits = np.zeros(len(people))
+    total = 0.0
+    estimates = []
+    effective = 0.0
+    for gene_sums, trait_sums, weight_sum, square_sum, chain_shift in results:
+        scale = np.exp(chain_shift - shift)
+        genes += gene_sums * scale
+        traits += trait_sums * scale
+        total += weight_sum * scale
+        estimates.append(np.hstack([gene_sums, trait_sums[:, None]]) / weight_sum)
+        effective += weight_sum ** 2 / square_sum
+
+    diagnostics = {
+        "samples": per_chain * chains,
+        "effective_samples": float(effective),
+        "max_error": chain_error(estimates),
+    }
+    return probabilities_from(people, genes / total, traits / total), diagnostics
+
+
+def gibbs_sampling(people, samples=1000, burn_in=200, chains=4, walkers=100,
+                   processes=None, seed=None):
+    """
+    Estimate gene and trait probabilities for each person by Gibbs
+    sampling over the gene counts.
+
+    Each chain runs `walkers` Markov chains side by side. A sweep redraws
+    every person's gene count given the rest of the family: their
+    parents, their children and the other parents of those children, and
+    their own observed trait. After `burn_in` sweeps, `samples` sweeps are
+    counted. Unobserved traits are not sampled; their probability given
+    each sampled gene count is averaged instead.
+
+    Return a tuple (probabilities, diagnostics): `probabilities` has the
+    same structure as the result of `enumerate_probabilities`, and
+    `diagnostics` is a dictionary with the number of samples, the largest
+    standard error of any probability, estimated from the spread between
+    chains, and the largest Gelman-Rubin statistic (R-hat) of any gene
+    probability, computed over all walkers. R-hat close to 1 suggests the
+    walkers have mixed.
+    """
+    if chains < 2:
+        raise ValueError("At least two chains are needed to estimate errors")
+
+    network = pedigree(people)
+    seeds = np.random.SeedSequence(seed).spawn(chains)
+    results = run_chains(gibbs_chain, [
+        (network, walkers, burn_in, samples, seeds[k]) for k in range(chains)
+    ], processes)
+
+    counts = np.concatenate([result[0] for result in results])
+    traits = np.concatenate([result[1] for result in results])
+    estimates = [
+        np.hstack([c.sum(axis=0), t.sum(axis=0)[:, None]]) / (walkers * samples)
+        for c, t in results
+    ]
+
+    diagnostics = {
+        "samples": chains * walkers * samples,
+        "max_error": chain_error(estimates),
+        "max_r_hat": r_hat(counts / samples, samples),
+    }
+    genes = counts.sum(axis=0) / (len(counts) * samples)
+    traits = traits.sum(axis=0) / (len(counts) * samples)
+    return probabilities_from(people, genes, traits), diagnostics
+
+
+def pedigree(people):
+    """
+    Return the family as a dictionary of arrays indexed by person id:
+        order       person ids, parents before children
+        mothers     id of each person's mother, or -1 for founders
+        fathers     id of each person's father, or -1 for founders
+        evidence    probability of each person's observed trait given
+                    0, 1 or 2 genes, or 1 if the trait is unknown
+    """
+    names = list(people)
+    index = {name: k for k, name in enumerate(names)}
+    mothers = np.array([index.get(people[name]["mother"], -1) for name in names])
+    fathers = np.array([index.get(people[name]["father"], -1) for name in names])
+
+    evidence = np.ones((len(names), 3))
+    for k, name in enumerate(names):
+        trait = people[name]["trait"]
+        if trait is not None:
+            evidence[k] = [PROBS["trait"][g][trait] for g in range(3)]
+
+    # Depth-first search so that parents come before their children
+    order = []
+    seen = set()
+    for start in range(len(names)):
+        stack = [(start, False)]
+        while stack:
+            k, ready = stack.pop()
+            if ready:
+                order.append(k)
+            elif k not in seen:
+                seen.add(k)
+                stack.append((k, True))
+                for parent in (mothers[k], fathers[k]):
+                    if parent >= 0 and parent not in seen:
+                        stack.append((parent, False))
+
+    return {
+        "order": order,
+        "mothers": mothers,
+        "fathers": fathers,
+        "evidence": evidence,
+    }
+
+
+def tables():
+    """
+    Return the gene and trait tables as arrays (gene, inheritance, trait),
+    indexed by [genes], [mother genes, father genes, genes] and
+    [genes, has trait].
+    """
+    gene = np.array([PROBS["gene"][g] for g in range(3)])
+    inheritance = inheritance_array()
+    trait = np.array([[PROBS["trait"][g][t] for t in (False, True)] for g in range(3)])
+    return gene, inheritance, trait
+
+
+def run_chains(function, arguments, processes):
+    """
+    Return the results of `function` for each item of `arguments`, run
+    across a pool of `processes` worker processes, or in this process if
+    `processes` is 1.
+    """
+    if processes == 1:
+        return [function(args) for args in arguments]
+    with multiprocessing.Pool(processes) as pool:
+        return pool.map(function, arguments)
+
+
+def weighting_chain(args):
+    """
+    Run one chain of `likelihood_weighting` in a worker process.
+
+    Return a tuple (gene_sums, trait_sums, weight_sum, square_sum, shift)
+    of sums of weights of samples by person and gene count, weighted
+    probabilities of having the trait, and the sum of weights and squared
+    weights. Weights are stored as exp(log weight - shift), so that they
+    do not underflow in large families.
+    """
+    network, samples, seed = args
+    rng = np.random.default_rng(seed)
+    gene, inheritance, trait = tables()
+    mothers, fathers = network["mothers"], network["fathers"]
+    log_evidence = np.log(network["evidence"])
+    n = len(mothers)
+
+    gene_sums = np.zeros((n, 3))
+    trait_sums = np.zeros(n)
+    weight_sum = 0.0
+    square_sum = 0.0
+    shift = -np.inf
+
+    for start in range(0, samples, BATCH_SIZE):
+        size = min(BATCH_SIZE, samples - start)
+        genes = np.zeros((size, n), dtype=np.intp)
+        log_weights = np.zeros(size)
+        for k in network["order"]:
+            if mothers[k] < 0:
+                probs = np.broadcast_to(gene, (size, 3))
+            else:
+                probs = inheritance[genes[:, mothers[k]], genes[:, fathers[k]]]
+            genes[:, k] = draw(probs, rng)
+            log_weights += log_evidence[k, genes[:, k]]
+
+        # Rescale earlier sums if this batch has a larger weight
+        batch_shift = log_weights.max()
+        if batch_shift > shift:
+            scale = np.exp(shift - batch_shift)
+            gene_sums *= scale
+            trait_sums *= scale
+            weight_sum *= scale
+            square_sum *= scale ** 2
+            shift = batch_shift
+        weights = np.exp(log_weights - shift)
+
+        for k in range(n):
+            gene_sums[k] += np.bincount(genes[:, k], weights=weights, minlength=3)
+        trait_sums += weights @ trait[genes, 1]
+        weight_sum += weights.sum()
+        square_sum += (weights ** 2).sum()
+
+    return gene_sums, trait_sums, weight_sum, square_sum, shift
+
+
+def gibbs_chain(args):
+    """
+    Run one chain of `gibbs_sampling` in a worker process.
+
+    Return a tuple (counts, traits), where `counts[w, k, g]` is the number
+    of counted sweeps in which walker `w` gave person `k` `g` genes and
+    `traits[w, k]` is the sum over those sweeps of the probability that
+    person `k` has the trait.
+    """
+    network, walkers, burn_in, samples, seed = args
+    rng = np.random.default_rng(seed)
+    gene, inheritance, trait = tables()
+    mothers, fathers = network["mothers"], network["fathers"]
+    evidence = network["evidence"]
+    n = len(mothers)
+
+    # Children of each person, with the other parent of each child
+    as_mother = [[] for _ in range(n)]
+    as_father = [[] for _ in range(n)]
+    for child in range(n):
+        if mothers[child] >= 0:
+            as_mother[mothers[child]].append(child)
+            as_father[fathers[child]].append(child)
+
+    # Start from a sample of the genes ignoring the evidence
+    genes = np.zeros((walkers, n), dtype=np.intp)
+    for k in network["order"]:
+        if mothers[k] < 0:
+            probs = np.broadcast_to(gene, (walkers, 3))
+        else:
+            probs = inheritance[genes[:, mothers[k]], genes[:, fathers[k]]]
+        genes[:, k] = draw(probs, rng)
+
+    counts = np.zeros((walkers, n, 3), dtype=np.int64)
+    traits = np.zeros((walkers, n))
+    for sweep in range(burn_in + samples):
+        for k in range(n):
+            if mothers[k] < 0:
+                probs = gene * evidence[k]
+            else:
+                probs = inheritance[genes[:, mothers[k]], genes[:, fathers[k]]] * evidence[k]
+            for child in as_mother[k]:
+                probs = probs * inheritance[:, genes[:, fathers[child]], genes[:, child]].T
+            for child in as_father[k]:
+                probs = probs * inheritance[genes[:, mothers[child]], :, genes[:, child]]
+            genes[:, k] = draw(np.broadcast_to(probs, (walkers, 3)), rng)
+
+        if sweep >= burn_in:
+            counts += genes[:, :, None] == np.arange(3)
+            traits += trait[genes, 1]
+
+    return counts, traits
+
+
+def draw(probs, rng):
+    """
+    Return one index drawn from each row of `probs`, an array of
+    unnormalized probabilities.
+    """
+    cumulative = np.cumsum(probs, axis=1)
+    u = rng.random(len(probs)) * cumulative[:, -1]
+    return (u[:, None] >= cumulative[:, :-1]).sum(axis=1)
+
+
+def chain_error(estimates):
+    """
+    Return the largest standard error of the mean of per-chain
+    `estimates`, a list of equally shaped arrays.
+    """
+    estimates = np.array(estimates)
+    return float((estimates.std(axis=0, ddof=1) / np.sqrt(len(estimates))).max())
+
+
+def r_hat(means, samples):
+    """
+    Return the largest Gelman-Rubin statistic over the gene probabilities,
+    given `means[w, k, g]`, the fraction of `samples` sweeps in which
+    walker `w` gave person `k` `g` genes. Probabilities that every walker
+    always or never sampled are skipped.
+    """
+    within = (means * (1 - means) * samples / (samples - 1)).mean(axis=0)
+    between = means.var(axis=0, ddof=1)
+    pooled = (samples - 1) / samples * within + between
+    mixed = within > 0
+    if not mixed.any():
+        return 1.0
+    return float(np.sqrt(pooled[mixed] / within[mixed]).max())
+
+
+def probabilities_from(people, genes, traits):
+    """
+    Return a probabilities dictionary given arrays of gene probabilities,
+    `genes[k, g]`, and trait probabilities, `traits[k]`, by person id.
+    People with an observed trait keep it.
+    """
+    probabilities = empty_probabilities(people)
+    for k, name in enumerate(people):
+        for g in range(3):
+            probabilities[name]["gene"][g] = float(genes[k, g])
+        trait = people[name]["trait"]
+        has_trait = float(traits[k]) if trait is None else float(trait)
+        probabilities[name]["trait"][True] = has_trait
+        probabilities[name]["trait"][False] = 1 - has_trait
+    return probabilities
@@ -0,0 +1,56 @@
+import copy
+import math
+import os
+import unittest
+from unittest import mock
+
+import heredity
+from heredity import enumerate_probabilities, load_data, log_probabilities
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# Every trait probability is multiplied by this. The posteriors do not
+# change, since every assignment is scaled by SCALE ** len(people), but
+# every joint probability of a family of three or more underflows to 0
+SCALE = 1e-120
+
+
+def scaled_probs():
+    probs = copy.deepcopy(heredity.PROBS)
+    for genes in probs["trait"]:
+        for trait in probs["trait"][genes]:
+            probs["trait"][genes][trait] *= SCALE
+    return probs
+
+
+class TestLogProbabilities(unittest.TestCase):
+
+    def families(self):
+        for k in range(3):
+            yield load_data(os.path.join(DATA, f"family{k}.csv"))
+
+    def assertSameMarginals(self, expected, actual):
+        for person in expected:
+            for field in expected[person]:
+                for value, p in expected[person][field].items():
+                    self.assertTrue(
+                        math.isclose(p, actual[person][field][value], abs_tol=1e-12),
+                        f"{person} {field} {value}: {p} != {actual[person][field][value]}"
+                    )
+
+    def test_matches_enumeration(self):
+        for people in self.families():
+            self.assertSameMarginals(enumerate_probabilities(people), log_probabilities(people))
+
+    def test_underflow(self):
+        for people in self.families():
+            expected = enumerate_probabilities(people)
+            with mock.patch.object(heredity, "PROBS", scaled_probs()):
+                with self.assertRaises(ZeroDivisionError):
+                    enumerate_probabilities(people)
+                actual = log_probabilities(people)
+            self.assertSameMarginals(expected, actual)
+
+
+if __name__ == "__main__":
+    unittest.main()
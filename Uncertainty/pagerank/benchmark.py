@@ -0,0 +1,73 @@
+import argparse
+import time
+
+import numpy as np
+
+from graph import Graph
+from pagerank import solve_pagerank
+
+SOLVERS = ["power", "gauss-seidel", "aitken", "quadratic", "push"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare PageRank solvers on synthetic power-law graphs."
+    )
+    parser.add_argument("--pages", type=int, default=100000)
+    parser.add_argument("--links", type=int, default=10,
+                        help="average number of links per page")
+    parser.add_argument("--damping", type=float, nargs="+",
+                        default=[0.85, 0.9, 0.95])
+    parser.add_argument("--tolerance", type=float, default=1e-8)
+    parser.add_argument("--solvers", nargs="+", default=SOLVERS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    graph = power_law_graph(args.pages, args.links, seed=args.seed)
+    print(f"Graph: {len(graph)} pages, {len(graph.targets)} links, "
+          f"{int(graph.dangling.sum())} without links")
+
+    for damping in args.damping:
+        reference = solve_pagerank(graph, damping, "power", tolerance=1e-13)
+        print(f"Damping {damping}, tolerance {args.tolerance}")
+        print(f"  {'solver':<14}{'iterations':>11}{'seconds':>10}{'L1 error':>12}")
+        for method in args.solvers:
+            stats = {}
+            start = time.perf_counter()
+            rank = solve_pagerank(graph, damping, method, args.tolerance, stats=stats)
+            seconds = time.perf_counter() - start
+            error = np.abs(rank - reference).sum()
+            print(f"  {method:<14}{stats['iterations']:>11}"
+                  f"{seconds:>10.3f}{error:>12.2e}")
+
+
+def power_law_graph(pages, links, exponent=2.1, locality=0.8, seed=0):
+    """
+    Return a random `graph.Graph` whose in-degrees and out-degrees follow
+    power laws with the given `exponent`, like links on the web.
+
+    A fraction `locality` of links point to nearby page ids, standing in
+    for links within the same site; the rest point to pages chosen in
+    proportion to their popularity. Local structure is what makes PageRank
+    converge slowly, so purely random graphs are a poor benchmark.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Zipf-like weights, shuffled so popularity is unrelated to page id
+    weights = np.arange(1, pages + 1) ** (-1 / (exponent - 1))
+    weights = rng.permutation(weights)
+
+    # Out-degrees proportional to weights, averaging `links` per page
+    out_degree = rng.poisson(links * weights * pages / weights.sum())
+    sources = np.repeat(np.arange(pages), out_degree)
+    count = len(sources)
+
+    popular = rng.choice(pages, count, p=weights / weights.sum())
+    nearby = (sources + rng.geometric(0.05, count) * rng.choice([-1, 1], count)) % pages
+    targets = np.where(rng.random(count) < locality, nearby, popular)
+
+    return Graph.from_edges(list(range(pages)), sources, targets)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import os
+
+import numpy as np
+
+
+class Graph():
+    """
+    Compact link graph for PageRank.
+
+    Pages are numbered 0 to N - 1, with names in `pages`. Links are stored
+    in compressed sparse row (CSR) form: the pages linked to by page `p`
+    are `targets[offsets[p]:offsets[p + 1]]`.
+
+    A graph can be written to a directory with `save` and opened again with
+    `load`, which memory-maps the arrays instead of reading them.
+    """
+
+    def __init__(self, pages, offsets, targets, sources=None):
+        self.pages = pages
+        self.offsets = offsets
+        self.targets = targets
+
+        # Number of links out of each page, and the source of every link
+        self.out_degree = np.diff(offsets)
+        if sources is None:
+            sources = np.repeat(
+                np.arange(len(pages), dtype=targets.dtype), self.out_degree
+            )
+        self.sources = sources
+
+        # Pages with no links spread their rank over every page
+        self.dangling = self.out_degree == 0
+
+        # Links grouped by target page, built on first use by `in_links`
+        self.incoming = None
+
+        # Page ids by name, built on first use by `page_ids`
+        self.ids = None
+
+    def __len__(self):
+        return len(self.pages)
+
+    @classmethod
+    def from_edges(cls, pages, sources, targets):
+        """
+        Build a graph from parallel arrays of link sources and targets,
+        given as page ids. Self-links and duplicate links are dropped.
+        """
+        n = len(pages)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+
+        # Encode each link as one integer, sort, and drop repeats
+        keep = sources != targets
+        edges = np.sort(sources[keep] * n + targets[keep])
+        edges = edges[np.diff(edges, prepend=-1) != 0]
+        sources, targets = np.divmod(edges, n)
+
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=offsets[1:])
+        return cls(list(pages), offsets, targets.astype(index_type(n)))
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build a graph from a corpus dictionary, as returned by `crawl`.
+        """
+        pages = sorted(corpus)
+        ids = {page: k for k, page in enumerate(pages)}
+        sources = []
+        targets = []
+        for page in pages:
+            for link in corpus[page]:
+                if link in ids:
+                    sources.append(ids[page])
+                    targets.append(ids[link])
+        return cls.from_edges(pages, sources, targets)
+
+    def to_corpus(self):
+        """
+        Return the graph as a corpus dictionary, as returned by `crawl`.
+        """
+        return {
+            page: set(
+                self.pages[t]
+                for t in self.targets[self.offsets[p]:self.offsets[p + 1]]
+            )
+            for p, page in enumerate(self.pages)
+        }
+
+    def in_links(self):
+        """
+        Return links grouped by the page they point to, as a pair of arrays
+        (in_offsets, in_sources): the pages linking to page `p` are
+        `in_sources[in_offsets[p]:in_offsets[p + 1]]`.
+        """
+        if self.incoming is None:
+            n = len(self.pages)
+            order = np.argsort(self.targets, kind="stable")
+            in_offsets = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.targets, minlength=n), out=in_offsets[1:])
+            self.incoming = (in_offsets, self.sources[order])
+        return self.incoming
+
+    def page_ids(self):
+        """
+        Return a dictionary mapping page names to page ids.
+        """
+        if self.ids is None:
+            self.ids = {page: k for k, page in enumerate(self.pages)}
+        return self.ids
+
+    def with_changes(self, added=(), removed=(), new_pages=()):
+        """
+        Return a new graph with pages `new_pages` appended and the links in
+        `added` and `removed`, given as (page, linked page) name pairs,
+        added and removed. Existing pages keep their ids.
+
+        Only the links of pages that gain or lose a link are rebuilt; the
+        links of every other page are copied across as they are.
+        """
+        ids = self.page_ids()
+        pages = self.pages
+        appended = [page for page in dict.fromkeys(new_pages) if page not in ids]
+        if appended:
+            ids = dict(ids)
+            ids.update((page, len(ids)) for page in appended)
+            pages = list(pages) + appended
+        old = len(self)
+        n = len(pages)
+
+        # New links of each page whose links change
+        changed = {}
+        for a, b in list(removed) + list(added):
+            p = ids[a]
+            if p not in changed:
+                links = self.targets[self.offsets[p]:self.offsets[p + 1]] if p < old else []
+                changed[p] = set(int(t) for t in links)
+        for a, b in removed:
+            changed[ids[a]].discard(ids[b])
+        for a, b in added:
+            if a != b:
+                changed[ids[a]].add(ids[b])
+
+        out_degree = np.zeros(n, dtype=np.int64)
+        out_degree[:old] = self.out_degree
+        pieces = []
+        start = 0
+        for p in sorted(changed):
+            out_degree[p] = len(changed[p])
+            pieces.append(self.targets[self.offsets[min(start, old)]:self.offsets[min(p, old)]])
+            pieces.append(np.array(sorted(changed[p]), dtype=np.int64))
+            start = p + 1
+        pieces.append(self.targets[self.offsets[min(start, old)]:])
+
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(out_degree, out=offsets[1:])
+        targets = np.concatenate(pieces).astype(index_type(n))
+        graph = Graph(pages, offsets, targets)
+        graph.ids = ids
+        return graph
+
+    def save(self, directory):
+        """
+        Write the graph to `directory` in the binary format read by `load`:
+            offsets.npy, targets.npy, sources.npy   the link arrays
+            names.bin                               UTF-8 page names, back to back
+            name_offsets.npy                        where each name starts and ends
+        """
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "offsets.npy"), self.offsets)
+        np.save(os.path.join(directory, "targets.npy"), self.targets)
+        np.save(os.path.join(directory, "sources.npy"), self.sources)
+
+        names = [str(page).encode() for page in self.pages]
+        name_offsets = np.zeros(len(names) + 1, dtype=np.int64)
+        np.cumsum([len(name) for name in names], out=name_offsets[1:])
+        np.save(os.path.join(directory, "name_offsets.npy"), name_offsets)
+        with open(os.path.join(directory, "names.bin"), "wb") as f:
+            for name in names:
+                f.write(name)
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Open a graph written by `save`. The arrays and page names are
+        memory-mapped read-only, so nothing is copied into memory up front
+        and every process opening the same graph shares one cached copy.
+        """
+        def array(name):
+            return np.load(os.path.join(directory, name), mmap_mode="r")
+
+        # Empty files cannot be memory-mapped
+        path = os.path.join(directory, "names.bin")
+        if os.path.getsize(path) > 0:
+            names = np.memmap(path, dtype=np.uint8, mode="r")
+        else:
+            names = np.zeros(0, dtype=np.uint8)
+
+        pages = PageNames(names, array("name_offsets.npy"))
+        return cls(pages, array("offsets.npy"), array("targets.npy"),
+                   sources=array("sources.npy"))
+
+    def vector(self, ranks):
+        """
+        Return a NumPy array of the values of dictionary `ranks` in page id
+        order, with 0 for pages missing from `ranks`.
+        """
+        return np.array([ranks.get(page, 0) for page in self.pages], dtype=float)
+
+    def ranks(self, vector):
+        """
+        Return a dictionary mapping page names to values of `vector`.
+        """
+        return {page: float(value) for page, value in zip(self.pages, vector)}
+
+
+class PageNames():
+    """
+    Read-only sequence of page names decoded on access from a block of
+    UTF-8 bytes, with name `k` at `data[offsets[k]:offsets[k + 1]]`.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, k):
+        return bytes(self.data[self.offsets[k]:self.offsets[k + 1]]).decode()
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+
+def index_type(n):
+    """
+    Return the smallest integer type able to hold page ids below `n`.
+    """
+    return np.int32 if n < 2 ** 31 else np.int64
@@ -1,11 +1,26 @@
+import heapq
+import multiprocessing
 import os
 import random
 import re
 import sys
+from collections import deque
+
+import numpy as np
+from scipy.sparse import csr_matrix, identity, tril, triu
+from scipy.sparse.linalg import splu
+
+from graph import Graph
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Matches the target of every link in an HTML page
+LINK_PATTERN = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Characters read at a time when streaming pages in `crawl_graph`
+CHUNK_SIZE = 1 << 20
+
 
 def main():
     if len(sys.argv) != 2:
@@ -35,7 +50,7 @@ def crawl(directory):
             continue
         with open(os.path.join(directory, filename)) as f:
             contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
+            links = LINK_PATTERN.findall(contents)
             pages[filename] = set(links) - {filename}
 
     # Only include links to other pages in the corpus
@@ -48,6 +63,80 @@ def crawl(directory):
     return pages
 
 
+def crawl_graph(directory, processes=None, output=None):
+    """
+    Parse a directory of HTML pages, like `crawl`, but return a compact
+    `graph.Graph` and scale to very large page dumps.
+
+    Page names are numbered once up front. Files are then streamed in
+    chunks by a pool of worker processes, each returning the ids of the
+    pages it links to, and the links go straight into the graph's arrays.
+
+    If `output` is given, the graph is also saved there with `Graph.save`,
+    so later runs can open it with `Graph.load` instead of crawling again.
+    """
+
+    pages = sorted(
+        filename for filename in os.listdir(directory)
+        if filename.endswith(".html")
+    )
+    ids = {page: k for k, page in enumerate(pages)}
+
+    sources = []
+    targets = []
+    paths = [os.path.join(directory, page) for page in pages]
+    with multiprocessing.Pool(processes, initializer=share_page_ids,
+                              initargs=(ids,)) as pool:
+        for source, links in enumerate(pool.imap(extract_links, paths, chunksize=64)):
+            sources.append(np.full(len(links), source, dtype=np.int64))
+            targets.append(links)
+
+    if pages:
+        graph = Graph.from_edges(pages, np.concatenate(sources), np.concatenate(targets))
+    else:
+        graph = Graph.from_edges(pages, [], [])
+    if output is not None:
+        graph.save(output)
+    return graph
+
+
+# Page ids shared by the worker processes of `crawl_graph`
+SHARED_PAGE_IDS = None
+
+
+def share_page_ids(ids):
+    """
+    Store the page name to id mapping for use by `extract_links`.
+    """
+    global SHARED_PAGE_IDS
+    SHARED_PAGE_IDS = ids
+
+
+def extract_links(path):
+    """
+    Return a NumPy array with the ids of the corpus pages linked to by the
+    HTML file at `path`, reading it `CHUNK_SIZE` characters at a time.
+    """
+
+    links = set()
+    tail = ""
+    with open(path) as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            text = tail + chunk
+            links.update(LINK_PATTERN.findall(text))
+
+            # Keep the last, possibly unfinished, tag for the next chunk,
+            # unless it is longer than a whole chunk
+            start = text.rfind("<")
+            tail = text[start:] if start != -1 and len(text) - start < CHUNK_SIZE else ""
+
+    ids = [SHARED_PAGE_IDS[link] for link in links if link in SHARED_PAGE_IDS]
+    return np.array(ids, dtype=np.int64)
+
+
 def transition_model(corpus, page, damping_factor):
     """
     Return a probability distribution over which page to visit next,
@@ -112,6 +201,168 @@ def sample_pagerank(corpus, damping_factor, n):
     return pagerank
 
 
+def sample_pagerank_fast(corpus, damping_factor, n):
+    """
+    Return PageRank values for each page by sampling `n` pages, like
+    `sample_pagerank`, but drawing each step in constant time.
+
+    Every distribution from `transition_model` is a mix of two uniform
+    choices, so instead of building it, each step picks a link of the
+    current page with probability `damping_factor`, and otherwise (or
+    if the page has no links) picks any page in the corpus.
+    """
+    pages = list(corpus)
+    links = {page: list(corpus[page]) for page in corpus}
+
+    # Initialize PageRank dictionary with 0 values
+    pagerank = {page: 0 for page in corpus}
+
+    # Start with a random page
+    current_page = random.choice(pages)
+
+    for _ in range(n):
+        pagerank[current_page] += 1
+        if links[current_page] and random.random() < damping_factor:
+            current_page = random.choice(links[current_page])
+        else:
+            current_page = random.choice(pages)
+
+    # Normalize the pagerank values
+    return {page: rank / n for page, rank in pagerank.items()}
+
+
+def sample_pagerank_walkers(corpus, damping_factor, n, walkers=1000, seed=None):
+    """
+    Return PageRank values for each page by sampling about `n` pages with
+    `walkers` independent random walkers advanced together with NumPy.
+
+    Each walker starts on a random page and takes `n // walkers` steps
+    according to the transition model. `corpus` may be a corpus
+    dictionary or a `graph.Graph`; `seed` makes the result reproducible.
+    """
+
+    graph = to_graph(corpus)
+    rng = np.random.default_rng(seed)
+    current = rng.integers(0, len(graph), walkers)
+    visits, current = walk(graph, damping_factor, current, max(1, n // walkers), rng)
+    return graph.ranks(visits / visits.sum())
+
+
+def walk(graph, damping_factor, current, steps, rng):
+    """
+    Advance the walkers at pages `current` by `steps` steps of the
+    transition model, using NumPy generator `rng`.
+
+    Return a tuple (visits, current) of the number of visits to each page
+    and the pages the walkers end on.
+    """
+
+    N = len(graph)
+    walkers = len(current)
+    visits = np.zeros(N, dtype=np.int64)
+
+    for _ in range(steps):
+        visits += np.bincount(current, minlength=N)
+
+        # Follow a random link where possible, otherwise jump anywhere
+        degree = graph.out_degree[current]
+        follow = (degree > 0) & (rng.random(walkers) < damping_factor)
+        link = graph.offsets[current] + (rng.random(walkers) * degree).astype(np.int64)
+        current = rng.integers(0, N, walkers)
+        current[follow] = graph.targets[link[follow]]
+
+    return visits, current
+
+
+def sample_pagerank_parallel(corpus, damping_factor, n, chains=8, walkers=1000,
+                             steps=10, target_error=None, processes=None,
+                             seed=None, stats=None):
+    """
+    Return PageRank values and their standard errors by running `chains`
+    independent chains across a pool of worker processes.
+
+    Each chain is a group of at most `walkers` walkers with its own random
+    seed. The walkers take enough steps between them to sample about `n`
+    pages, split into rounds of at most `steps` steps; after every round
+    the chains' visit counts are merged and the standard error of each
+    page's rank is estimated from the spread of the per-chain estimates.
+    If `target_error` is given, sampling stops early once every page's
+    standard error is below it.
+
+    Return a tuple (ranks, errors) of dictionaries keyed by page name. If
+    `stats` is a dictionary, the number of pages sampled and of rounds run
+    are stored in `stats["samples"]` and `stats["rounds"]`.
+    """
+
+    if chains < 2:
+        raise ValueError("At least two chains are needed to estimate errors")
+
+    graph = to_graph(corpus)
+    N = len(graph)
+
+    # Steps each walker takes in total, rounding `n` up to whole steps
+    walkers = min(walkers, -(-n // chains))
+    remaining = max(1, -(-n // (chains * walkers)))
+
+    seeds = np.random.SeedSequence(seed).spawn(chains)
+    starts = [
+        np.random.default_rng(s.spawn(1)[0]).integers(0, N, walkers)
+        for s in seeds
+    ]
+    visits = np.zeros((chains, N), dtype=np.int64)
+    rounds = 0
+
+    # A saved graph is opened by path in each worker, sharing its pages
+    shared = corpus if isinstance(corpus, str) else graph
+    with multiprocessing.Pool(processes, initializer=share_graph,
+                              initargs=(shared,)) as pool:
+        while remaining > 0:
+            round_steps = min(steps, remaining)
+            remaining -= round_steps
+            rounds += 1
+            results = pool.map(walk_chain, [
+                (damping_factor, starts[k], round_steps, seeds[k].spawn(1)[0])
+                for k in range(chains)
+            ])
+            for k, (chain_visits, current) in enumerate(results):
+                visits[k] += chain_visits
+                starts[k] = current
+
+            estimates = visits / visits.sum(axis=1, keepdims=True)
+            errors = estimates.std(axis=0, ddof=1) / np.sqrt(chains)
+            if target_error is not None and errors.max() < target_error:
+                break
+
+    if stats is not None:
+        stats["samples"] = int(visits.sum())
+        stats["rounds"] = rounds
+    ranks = visits.sum(axis=0) / visits.sum()
+    return graph.ranks(ranks), graph.ranks(errors)
+
+
+# Graph shared by the worker processes of `sample_pagerank_parallel`
+SHARED_GRAPH = None
+
+
+def share_graph(graph):
+    """
+    Store `graph`, or the graph saved in directory `graph`, for use by
+    `walk_chain` in a worker process.
+    """
+    global SHARED_GRAPH
+    SHARED_GRAPH = to_graph(graph)
+
+
+def walk_chain(args):
+    """
+    Advance one chain of `sample_pagerank_parallel` in a worker process.
+    """
+
+    damping_factor, current, steps, seed = args
+    rng = np.random.default_rng(seed)
+    return walk(SHARED_GRAPH, damping_factor, current, steps, rng)
+
+
 def iterate_pagerank(corpus, damping_factor):
     """
     Return PageRank values for each page by iteratively updating
@@ -164,5 +415,555 @@ def iterate_pagerank(corpus, damping_factor):
     return pagerank
 
 
+def iterate_pagerank_sparse(corpus, damping_factor, tolerance=1e-6,
+                            method="power"):
+    """
+    Return PageRank values for each page, like `iterate_pagerank`, but
+    using a vectorized solver over a compact link graph.
+
+    `corpus` may be a corpus dictionary or a `graph.Graph`. Iteration stops
+    once the sum of absolute changes over all pages is below `tolerance`.
+    `method` names a solver from `solve_pagerank`.
+    """
+    graph = to_graph(corpus)
+    return graph.ranks(solve_pagerank(graph, damping_factor, method, tolerance))
+
+
+def solve_pagerank(graph, damping_factor, method="power", tolerance=1e-6,
+                   stats=None):
+    """
+    Return the PageRank vector of `graph` computed by the solver named
+    `method`:
+        "power"         power iteration (`power_iteration`)
+        "gauss-seidel"  Gauss-Seidel sweeps (`gauss_seidel`)
+        "aitken"        power iteration with Aitken extrapolation
+        "quadratic"     power iteration with quadratic extrapolation
+        "push"          approximate forward push (`forward_push`)
+
+    If `stats` is a dictionary, the number of iterations is stored in
+    `stats["iterations"]`.
+    """
+    if method == "power":
+        return power_iteration(graph, damping_factor, tolerance, stats=stats)
+    if method == "gauss-seidel":
+        return gauss_seidel(graph, damping_factor, tolerance, stats=stats)
+    if method in ("aitken", "quadratic"):
+        return extrapolated_iteration(graph, damping_factor, tolerance, method,
+                                      stats=stats)
+    if method == "push":
+        return forward_push(graph, damping_factor, tolerance, stats=stats)
+    raise ValueError(f"Unknown PageRank solver: {method}")
+
+
+def personalized_pagerank(corpus, damping_factor, seeds, k=None, tolerance=1e-6):
+    """
+    Return personalized PageRank values, where the random surfer teleports
+    to pages in `seeds` instead of to any page in the corpus.
+
+    `seeds` is either a collection of page names, teleported to with equal
+    probability, or a dictionary mapping page names to weights. Pages
+    without links also jump according to `seeds`.
+
+    If `k` is given, return only the `k` highest-ranked pages as a list of
+    (page, rank) pairs; otherwise return a dictionary for every page.
+    """
+    graph = to_graph(corpus)
+    ranks = personalized_pagerank_batch(graph, damping_factor, [seeds], tolerance)
+    if k is None:
+        return graph.ranks(ranks[:, 0])
+    return top_pages(graph, ranks[:, 0], k)
+
+
+def personalized_pagerank_batch(corpus, damping_factor, seed_sets, tolerance=1e-6):
+    """
+    Return a NumPy array with one column of personalized PageRank values
+    per entry of `seed_sets`, each as accepted by `personalized_pagerank`.
+
+    All columns are iterated together as one matrix, so each step is one
+    sparse matrix product over the links for the whole batch. Iteration stops once every
+    column's sum of absolute changes is below `tolerance`.
+    """
+
+    graph = to_graph(corpus)
+    N = len(graph)
+    ids = {page: k for k, page in enumerate(graph.pages)}
+
+    # Teleport distribution of every column, stored by its non-zero entries
+    rows, columns, weights = [], [], []
+    for column, seeds in enumerate(seed_sets):
+        seeds = seeds if isinstance(seeds, dict) else dict.fromkeys(seeds, 1)
+        total = sum(seeds.values())
+        for page, weight in seeds.items():
+            rows.append(ids[page])
+            columns.append(column)
+            weights.append(weight / total)
+    rows, columns, weights = np.array(rows), np.array(columns), np.array(weights)
+
+    links = link_matrix(graph)
+
+    rank = np.zeros((N, len(seed_sets)))
+    np.add.at(rank, (rows, columns), weights)
+    while True:
+        new_rank = links @ rank
+        new_rank *= damping_factor
+
+        # Teleporting, and jumps from pages without links, go to the seeds
+        jump = (1 - damping_factor) + damping_factor * rank[graph.dangling].sum(axis=0)
+        np.add.at(new_rank, (rows, columns), jump[columns] * weights)
+
+        change = np.abs(new_rank - rank).sum(axis=0)
+        rank = new_rank
+        if change.max() < tolerance:
+            return rank
+
+
+def link_matrix(graph):
+    """
+    Return the column-stochastic link matrix of `graph`, without the
+    columns of pages that have no links, as a SciPy CSR matrix: entry
+    (p, q) is the share of page q's rank passed to page p.
+    """
+
+    in_offsets, in_sources = graph.in_links()
+    share = link_shares(graph)
+    return csr_matrix(
+        (share[in_sources], in_sources, in_offsets), shape=(len(graph), len(graph))
+    )
+
+
+def top_pages(corpus, ranks, k):
+    """
+    Return the `k` pages with the highest values in `ranks`, a NumPy array
+    indexed by page id, as a list of (page, rank) pairs, highest first.
+    A heap keeps this O(N log k) instead of sorting every page.
+    """
+
+    graph = to_graph(corpus)
+    best = heapq.nlargest(k, range(len(graph)), key=ranks.__getitem__)
+    return [(graph.pages[page], float(ranks[page])) for page in best]
+
+
+def update_pagerank(graph, ranks, damping_factor, added=(), removed=(),
+                    new_pages=(), tolerance=1e-6, local=False):
+    """
+    Return a tuple (graph, ranks) for `graph` after a change to the corpus,
+    reusing `ranks`, the converged PageRank values before the change.
+
+    `added` and `removed` are (page, linked page) pairs of names, and
+    `new_pages` are pages added to the corpus. Iteration is warm-started
+    from the old ranks, with new pages starting at 1 / N.
+
+    If `local` is True, instead of sweeping the whole graph, only the pages
+    whose rank is off by more than `tolerance / N` are updated, pushing the
+    correction along their links (see `push_pagerank`). This saves sweeps,
+    not the rest of the update: converting `ranks` and the result between
+    dictionaries and arrays still touches every page, so on large graphs
+    pass `ranks` as an array indexed by page id where possible.
+    """
+
+    old_graph = to_graph(graph)
+    old_rank = old_graph.vector(ranks) if isinstance(ranks, dict) else ranks
+    graph = old_graph.with_changes(added, removed, new_pages)
+    N = len(graph)
+
+    rank = np.full(N, 1 / N)
+    rank[:len(old_graph)] = old_rank
+    rank /= rank.sum()
+
+    if not local:
+        return graph, graph.ranks(power_iteration(graph, damping_factor, tolerance, rank))
+
+    if len(graph) != len(old_graph):
+
+        # Teleporting changes for every page: compute the full residual
+        residual = pagerank_step(graph, damping_factor, rank, link_shares(graph)) - rank
+        uniform = 0.0
+    else:
+
+        # Only links out of the changed pages moved rank around
+        residual = np.zeros(N)
+        uniform = 0.0
+        ids = graph.page_ids()
+        changed = set(ids[a] for a, b in list(added) + list(removed))
+        for page in changed:
+            for g, sign in ((old_graph, -1), (graph, 1)):
+                links = g.targets[g.offsets[page]:g.offsets[page + 1]]
+                amount = sign * damping_factor * rank[page]
+                if len(links):
+                    residual[links] += amount / len(links)
+                else:
+                    uniform += amount / N
+
+    rank = push_pagerank(graph, damping_factor, rank, residual, uniform, tolerance)
+    return graph, graph.ranks(rank)
+
+
+def link_shares(graph):
+    """
+    Return the share of a page's rank passed along each of its links,
+    which is 0 for pages without links.
+    """
+
+    share = np.zeros(len(graph))
+    share[~graph.dangling] = 1 / graph.out_degree[~graph.dangling]
+    return share
+
+
+def pagerank_step(graph, damping_factor, rank, share):
+    """
+    Return the result of one power iteration step from `rank`, given the
+    `link_shares` of the graph.
+    """
+
+    N = len(graph)
+    spread = np.bincount(
+        graph.targets, weights=(rank * share)[graph.sources], minlength=N
+    )
+    dangling = rank[graph.dangling].sum()
+    return (1 - damping_factor) / N + damping_factor * (spread + dangling / N)
+
+
+def push_pagerank(graph, damping_factor, rank, residual, uniform, tolerance):
+    """
+    Correct `rank` by pushing `residual`, the amount each page's rank is off
+    by, along its links until every page's residual is at most
+    `tolerance / N`. `uniform` is an extra residual shared by every page,
+    which pages without links produce and which is only pushed, in one
+    sweep, once it grows above `tolerance`.
+
+    Only pages near a change are touched, so after small edits this costs
+    far less than a sweep over the whole graph. If the correction spreads
+    so far that pushing would cost more than a few sweeps, the remaining
+    residual is added to `rank` and `power_iteration` finishes from there.
+    """
+
+    N = len(graph)
+    threshold = tolerance / N
+    rank = rank.copy()
+    share = link_shares(graph)
+    dangling_pages = int(graph.dangling.sum())
+
+    queued = np.abs(residual) > threshold
+    queue = deque(np.nonzero(queued)[0].tolist())
+
+    # Links followed so far. Pushing runs one page at a time in Python,
+    # so give up once it has done a fiftieth of a vectorized sweep's work
+    work = 0
+    budget = (len(graph.targets) + N) // 50
+
+    while True:
+        while queue:
+            if work > budget:
+                rank += residual + uniform
+                return power_iteration(graph, damping_factor, tolerance, rank / rank.sum())
+            page = queue.popleft()
+            queued[page] = False
+            amount = residual[page]
+            if abs(amount) <= threshold:
+                continue
+
+            # Settle this page's residual and pass it along its links
+            rank[page] += amount
+            residual[page] = 0
+            start, end = graph.offsets[page], graph.offsets[page + 1]
+            work += end - start + 1
+            if start == end:
+                uniform += damping_factor * amount / N
+                continue
+            links = graph.targets[start:end]
+            residual[links] += damping_factor * amount / (end - start)
+            for link in links[(np.abs(residual[links]) > threshold) & ~queued[links]]:
+                queued[link] = True
+                queue.append(link)
+
+        if abs(uniform) * N <= tolerance:
+            break
+
+        # Push the shared residual from every page at once
+        work += budget
+        rank += uniform
+        residual += damping_factor * np.bincount(
+            graph.targets, weights=uniform * share[graph.sources], minlength=N
+        )
+        uniform = damping_factor * uniform * dangling_pages / N
+        queued = np.abs(residual) > threshold
+        queue = deque(np.nonzero(queued)[0].tolist())
+
+    rank += uniform
+    return rank / rank.sum()
+
+
+def to_graph(corpus):
+    """
+    Return `corpus` as a `graph.Graph`, converting a corpus dictionary,
+    or opening a graph directory written by `Graph.save`.
+    """
+
+    if isinstance(corpus, Graph):
+        return corpus
+    if isinstance(corpus, str):
+        return Graph.load(corpus)
+    return Graph.from_corpus(corpus)
+
+
+def power_iteration(graph, damping_factor, tolerance=1e-6, rank=None, stats=None):
+    """
+    Return the PageRank vector of `graph` as a NumPy array indexed by page id.
+    Iteration starts from `rank` if given, otherwise from 1 / N everywhere.
+
+    Each step spreads every page's rank evenly over its links with one
+    sparse gather and scatter. Pages without links are handled as a
+    rank-one correction: their total rank is spread evenly over all pages.
+    """
+
+    N = len(graph)
+    rank = np.full(N, 1 / N) if rank is None else np.asarray(rank, dtype=float)
+    share = link_shares(graph)
+    iterations = 0
+
+    while True:
+        iterations += 1
+        new_rank = pagerank_step(graph, damping_factor, rank, share)
+        change = np.abs(new_rank - rank).sum()
+        rank = new_rank
+        if change < tolerance:
+            if stats is not None:
+                stats["iterations"] = iterations
+            return rank
+
+
+def gauss_seidel(graph, damping_factor, tolerance=1e-6, stats=None):
+    """
+    Return the PageRank vector of `graph` using Gauss-Seidel sweeps.
+
+    Each sweep updates the pages in order of id, and every page uses the
+    values of lower-numbered pages already updated in the same sweep. This
+    is one triangular solve with the links from lower to higher ids, which
+    is factored once by SuperLU in page order so that no fill-in is added.
+    Links to lower ids and pages without links use the previous sweep's
+    values. Sweeps stop once the sum of absolute changes over all pages is
+    below `tolerance`.
+    """
+
+    N = len(graph)
+    rank = np.full(N, 1 / N)
+    matrix = link_matrix(graph)
+    lower = splu(
+        (identity(N) - damping_factor * tril(matrix)).tocsc(),
+        permc_spec="NATURAL", diag_pivot_thresh=0
+    )
+    upper = damping_factor * triu(matrix, k=1, format="csr")
+    iterations = 0
+
+    while True:
+        iterations += 1
+        dangling = rank[graph.dangling].sum()
+        new_rank = lower.solve(
+            (1 - damping_factor + damping_factor * dangling) / N + upper @ rank
+        )
+
+        # Sweeps do not keep the total at 1; rescaling keeps the error from
+        # building up along the PageRank vector itself, which decays slowly
+        new_rank /= new_rank.sum()
+        change = np.abs(new_rank - rank).sum()
+        rank = new_rank
+        if change < tolerance:
+            if stats is not None:
+                stats["iterations"] = iterations
+            return rank
+
+
+def extrapolated_iteration(graph, damping_factor, tolerance=1e-6,
+                           method="quadratic", every=10, stats=None):
+    """
+    Return the PageRank vector of `graph` using power iteration, replacing
+    the current vector every `every` iterations by an extrapolation from
+    the last few iterates, which removes the slowest-decaying error terms.
+
+    `method` is "aitken" for componentwise Aitken delta-squared
+    extrapolation from three iterates, or "quadratic" for quadratic
+    extrapolation from four iterates (Kamvar et al., 2003).
+    """
+
+    N = len(graph)
+    rank = np.full(N, 1 / N)
+    share = link_shares(graph)
+    history = [rank]
+    iterations = 0
+
+    while True:
+        iterations += 1
+        new_rank = pagerank_step(graph, damping_factor, rank, share)
+        change = np.abs(new_rank - rank).sum()
+        rank = new_rank
+        if change < tolerance:
+            if stats is not None:
+                stats["iterations"] = iterations
+            return rank
+
+        history = history[-3:] + [rank]
+        if iterations % every == 0 and len(history) == 4:
+            if method == "aitken":
+                rank = aitken(*history[-3:])
+            else:
+                rank = quadratic_extrapolation(*history)
+            history = [rank]
+
+
+def aitken(x0, x1, x2, epsilon=1e-15):
+    """
+    Return the componentwise Aitken extrapolation of three iterates,
+    keeping the latest iterate where the extrapolation is undefined.
+    """
+
+    denominator = x2 - 2 * x1 + x0
+    safe = np.abs(denominator) > epsilon
+    result = x2.copy()
+    result[safe] = x2[safe] - (x2[safe] - x1[safe]) ** 2 / denominator[safe]
+    result = np.maximum(result, 0)
+    return result / result.sum()
+
+
+def quadratic_extrapolation(x0, x1, x2, x3):
+    """
+    Return the quadratic extrapolation of four successive iterates.
+    """
+
+    y = np.column_stack([x1 - x0, x2 - x0])
+    gamma = np.linalg.lstsq(y, -(x3 - x0), rcond=None)[0]
+    g1, g2, g3 = gamma[0], gamma[1], 1
+    result = (g1 + g2 + g3) * x1 + (g2 + g3) * x2 + g3 * x3
+    result = np.maximum(result, 0)
+    return result / result.sum()
+
+
+def forward_push(graph, damping_factor, tolerance=1e-6, stats=None):
+    """
+    Return an approximate PageRank vector of `graph` by forward push.
+
+    Starting from no rank and the teleport probability as residual, every
+    round settles the residual of all pages whose residual is above
+    `tolerance / N` and pushes it along their links. Pages below the
+    threshold are left alone, so later rounds touch fewer and fewer links.
+    The total residual left over bounds the error.
+    """
+
+    N = len(graph)
+    threshold = tolerance / N
+    share = link_shares(graph)
+    rank = np.zeros(N)
+    residual = np.full(N, (1 - damping_factor) / N)
+    iterations = 0
+
+    while True:
+        active = residual > threshold
+        if not active.any():
+            break
+        iterations += 1
+
+        amount = np.where(active, residual, 0)
+        rank += amount
+        residual -= amount
+
+        links = active[graph.sources]
+        sources = graph.sources[links]
+        residual += damping_factor * np.bincount(
+            graph.targets[links], weights=amount[sources] * share[sources],
+            minlength=N
+        )
+        residual += damping_factor * amount[graph.dangling].sum() / N
+
+    if stats is not None:
+        stats["iterations"] = iterations
+    return rank / rank.sum()
+
+
+def partition_graph(corpus, directory, block_links=1 << 24):
+    """
+    Write the links of `corpus` (a corpus dictionary, `graph.Graph` or saved
+    graph directory) to `directory` as blocks of at most `block_links`
+    links each, for `external_pagerank`.
+
+    Each block is a file block_<k>.npy holding a 2 x B array of link
+    sources and targets. The number of links out of every page is saved
+    as out_degree.npy. Links are copied a block at a time, so a saved
+    graph larger than memory can be partitioned too.
+
+    Return the number of blocks written.
+    """
+
+    graph = to_graph(corpus)
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, "out_degree.npy"), np.asarray(graph.out_degree))
+
+    blocks = 0
+    for start in range(0, len(graph.targets), block_links):
+        end = min(start + block_links, len(graph.targets))
+        block = np.stack([graph.sources[start:end], graph.targets[start:end]])
+        np.save(os.path.join(directory, f"block_{blocks}.npy"), block)
+        blocks += 1
+
+    # Remove blocks left over from partitioning a larger graph here before
+    stale = blocks
+    while os.path.exists(os.path.join(directory, f"block_{stale}.npy")):
+        os.remove(os.path.join(directory, f"block_{stale}.npy"))
+        stale += 1
+
+    return blocks
+
+
+def external_pagerank(directory, damping_factor, tolerance=1e-6, stats=None):
+    """
+    Return the PageRank vector, indexed by page id, of a graph partitioned
+    into `directory` by `partition_graph`, without loading its links.
+
+    Every iteration streams the link blocks from disk one after another,
+    so only a few vectors with one value per page stay in memory. As in
+    `iterate_pagerank`, each page keeps (1 - d) / N, passes d times its
+    rank evenly along its links, and pages without links spread theirs
+    over every page. Iteration stops once the sum of absolute changes is
+    below `tolerance`.
+
+    If `stats` is a dictionary, the number of iterations and the bytes
+    read in each iteration are stored in `stats["iterations"]` and
+    `stats["bytes_read"]`.
+    """
+
+    out_degree = np.load(os.path.join(directory, "out_degree.npy"))
+    N = len(out_degree)
+    dangling = out_degree == 0
+    share = np.zeros(N)
+    share[~dangling] = 1 / out_degree[~dangling]
+    paths = []
+    while os.path.exists(os.path.join(directory, f"block_{len(paths)}.npy")):
+        paths.append(os.path.join(directory, f"block_{len(paths)}.npy"))
+
+    rank = np.full(N, 1 / N)
+    bytes_read = []
+
+    while True:
+        spread = np.zeros(N)
+        contribution = rank * share
+        read = 0
+        for path in paths:
+            sources, targets = np.load(path)
+            read += os.path.getsize(path)
+            spread += np.bincount(
+                targets, weights=contribution[sources], minlength=N
+            )
+        bytes_read.append(read)
+
+        new_rank = (1 - damping_factor) / N + damping_factor * (
+            spread + rank[dangling].sum() / N
+        )
+        change = np.abs(new_rank - rank).sum()
+        rank = new_rank
+        if change < tolerance:
+            if stats is not None:
+                stats["iterations"] = len(bytes_read)
+                stats["bytes_read"] = bytes_read
+            return rank
+
+
 if __name__ == "__main__":
     main()
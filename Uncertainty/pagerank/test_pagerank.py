@@ -0,0 +1,110 @@
+import math
+import os
+import unittest
+
+import numpy as np
+
+from benchmark import power_law_graph
+from graph import Graph
+from pagerank import (
+    DAMPING, crawl, iterate_pagerank, iterate_pagerank_sparse,
+    power_iteration, sample_pagerank_parallel, solve_pagerank, update_pagerank
+)
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus0")
+
+
+class TestSamplePagerankParallel(unittest.TestCase):
+
+    def setUp(self):
+        self.corpus = crawl(CORPUS)
+
+    def test_samples_follow_n(self):
+        chains, walkers, steps = 4, 100, 10
+        for n in (1, 399, 4000, 12345, 100000):
+            stats = {}
+            sample_pagerank_parallel(
+                self.corpus, DAMPING, n, chains=chains, walkers=walkers,
+                steps=steps, processes=2, seed=0, stats=stats
+            )
+            self.assertGreaterEqual(stats["samples"], n)
+            self.assertLess(stats["samples"], n + chains * walkers * steps)
+
+    def test_target_error_stops_early(self):
+        stats = {}
+        sample_pagerank_parallel(
+            self.corpus, DAMPING, 1000000, chains=4, walkers=100, steps=10,
+            target_error=0.01, processes=2, seed=0, stats=stats
+        )
+        self.assertLess(stats["samples"], 1000000)
+        self.assertEqual(stats["samples"], stats["rounds"] * 4 * 100 * 10)
+
+    def test_matches_iteration(self):
+        ranks, errors = sample_pagerank_parallel(
+            self.corpus, DAMPING, 200000, walkers=100, processes=2, seed=0
+        )
+        expected = iterate_pagerank(self.corpus, DAMPING)
+        self.assertTrue(math.isclose(sum(ranks.values()), 1))
+        for page in expected:
+            self.assertLess(abs(ranks[page] - expected[page]), 5 * errors[page] + 1e-3)
+
+
+class TestGaussSeidel(unittest.TestCase):
+
+    def test_fewer_iterations_than_power(self):
+        graph = power_law_graph(20000, 10)
+        for damping in (0.85, 0.95):
+            reference = solve_pagerank(graph, damping, "power", tolerance=1e-13)
+            power_stats = {}
+            solve_pagerank(graph, damping, "power", 1e-8, stats=power_stats)
+            stats = {}
+            rank = solve_pagerank(graph, damping, "gauss-seidel", 1e-8, stats=stats)
+            self.assertLess(np.abs(rank - reference).sum(), 1e-6)
+            self.assertLess(stats["iterations"], power_stats["iterations"])
+
+    def test_corpus(self):
+        corpus = crawl(CORPUS)
+        expected = iterate_pagerank_sparse(corpus, DAMPING, tolerance=1e-12)
+        ranks = iterate_pagerank_sparse(
+            corpus, DAMPING, tolerance=1e-12, method="gauss-seidel"
+        )
+        for page in expected:
+            self.assertTrue(math.isclose(ranks[page], expected[page], abs_tol=1e-10))
+
+
+class TestUpdatePagerank(unittest.TestCase):
+
+    def test_matches_rebuilt_graph(self):
+        graph = power_law_graph(2000, 5)
+        ranks = power_iteration(graph, DAMPING, 1e-10)
+        corpus = graph.to_corpus()
+        pages = list(graph.pages)
+        new = len(pages)
+        added = [(pages[k], pages[(7 * k + 3) % len(pages)]) for k in range(0, 2000, 97)]
+        added.append((pages[5], new))
+        removed = [
+            (pages[k], pages[graph.targets[graph.offsets[k]]])
+            for k in range(0, 2000, 89)
+            if graph.out_degree[k]
+        ]
+        for a, b in removed:
+            corpus[a].discard(b)
+        for a, b in added:
+            corpus[a].add(b)
+        corpus[new] = set()
+        expected = Graph.from_corpus(corpus)
+
+        for local in (False, True):
+            new_graph, new_ranks = update_pagerank(
+                graph, ranks, DAMPING, added, removed, [new], 1e-10, local
+            )
+            self.assertEqual(new_graph.to_corpus(), corpus)
+            expected_ranks = expected.ranks(power_iteration(expected, DAMPING, 1e-12))
+            for page in expected_ranks:
+                self.assertTrue(
+                    math.isclose(new_ranks[page], expected_ranks[page], abs_tol=1e-9)
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()